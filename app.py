@@ -528,18 +528,12 @@ else:
 
     # Import some stats for the sidebar
     try:
-        from models.campaign import Campaign
-        import pandas as pd
+        from utils import cache
 
-        # Get statistics data
-        campaigns = Campaign.get_all_campaigns()
-        total_campaigns = len(campaigns) if campaigns else 0
-
-        # Calculate total fundraising
-        total_btc = 0
-        if campaigns:
-            for campaign in campaigns:
-                total_btc += campaign['current_amount']
+        # Get statistics data; cached until campaign data changes
+        stats = cache.get_dashboard_stats()
+        total_campaigns = stats['total_campaigns']
+        total_btc = stats['total_raised']
 
         # Display statistics
         st.sidebar.markdown("### Dashboard Stats")
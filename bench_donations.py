@@ -0,0 +1,87 @@
+# script: bench_donations.py
+# Compare donation throughput with and without group commit.
+#
+#   python bench_donations.py
+#   python bench_donations.py --donations 20000 --threads 64 --synchronous FULL
+#
+# Runs against a throwaway data directory (OPENFUNDS_DATA_ROOT is set before
+# the database layer is imported), so the real campaigns database and CSV
+# export are left alone.
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+
+def setup(synchronous, campaigns):
+    from db import database
+
+    # Run the export init_db() scheduled on import now, rather than at exit
+    # once the throwaway data directory is gone
+    database.flush_exports()
+    database.close_all_connections()
+    # Measure the database path only; exports are not part of a donation
+    database.schedule_export = lambda: None
+    database.export_to_csv = lambda: True
+    database.PRAGMAS = tuple(p for p in database.PRAGMAS if not p.startswith('PRAGMA synchronous'))
+    database.PRAGMAS += (f'PRAGMA synchronous={synchronous}',)
+    database.init_db()
+    with database.transaction() as conn:
+        conn.executemany(
+            'INSERT INTO campaigns (title, description, btc_address, target_amount, owner_name) VALUES (?, ?, ?, ?, ?)',
+            [(f'Bench {i}', 'Benchmark campaign', 'bc1bench', 1e12, 'bench') for i in range(campaigns)]
+        )
+        return [row['id'] for row in conn.execute('SELECT id FROM campaigns')]
+
+
+def run(donate, ids, donations, threads):
+    """Call donate() from `threads` threads and return donations per second."""
+    per_thread = donations // threads
+
+    def worker(offset):
+        for i in range(per_thread):
+            donate(ids[(offset + i) % len(ids)], 0.001)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main(donations, threads, campaigns, synchronous):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['OPENFUNDS_DATA_ROOT'] = tmp
+        from db import database
+        from db.donation_queue import DonationQueue
+
+        ids = setup(synchronous, campaigns)
+        print(f"{donations} donations from {threads} threads over {campaigns} campaigns (synchronous={synchronous})")
+
+        rate = run(database.donate_to_campaign, ids, donations, threads)
+        print(f"  one transaction per donation: {rate:10.0f} donations/sec")
+
+        donation_queue = DonationQueue()
+        rate = run(donation_queue.donate, ids, donations, threads)
+        donation_queue.close()
+        print(f"  group commit:                 {rate:10.0f} donations/sec")
+
+        with database.connection() as conn:
+            count, total = conn.execute('SELECT COUNT(*), TOTAL(amount) FROM donations').fetchone()
+            raised = conn.execute('SELECT TOTAL(current_amount) FROM campaigns').fetchone()[0]
+        expected = 2 * (donations // threads) * threads
+        print(f"  ledger rows: {count} (expected {expected}), totals match: {abs(total - raised) < 1e-6}")
+        database.close_all_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark donation throughput with and without group commit.")
+    parser.add_argument("--donations", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--campaigns", type=int, default=100)
+    parser.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"])
+    args = parser.parse_args()
+    main(args.donations, args.threads, args.campaigns, args.synchronous)
@@ -0,0 +1,109 @@
+# script: bench_encoder.py
+# Compare encode latency and throughput with and without micro-batching.
+#
+#   python bench_encoder.py
+#   python bench_encoder.py --synthetic --requests 2000 --concurrency 1 8 64
+#
+# Each caller encodes one campaign text per request, like a creator pressing
+# "Check for Similar Campaigns". Without sentence-transformers installed (or
+# with --synthetic) a stand-in encoder is used: a fixed per-call overhead
+# that holds the GIL plus matrix work proportional to the batch, roughly
+# shaped like a small transformer on CPU.
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from models.embedding_store import MODEL_NAME
+from models.encode_batcher import ENCODE_BATCH_WINDOW, ENCODE_MAX_BATCH, EncodeBatcher
+
+TEXT = "Books for remote colleges and schools. Help us raise funds to donate learning materials."
+
+
+class SyntheticEncoder:
+    """Stand-in for SentenceTransformer.encode with per-call overhead and per-token matrix work."""
+
+    def __init__(self, dim=384, tokens_per_text=32, call_overhead=0.002):
+        rng = np.random.default_rng(0)
+        self.tokens_per_text = tokens_per_text
+        self.call_overhead = call_overhead
+        self.w1 = rng.standard_normal((dim, dim * 4), dtype=np.float32)
+        self.w2 = rng.standard_normal((dim * 4, dim), dtype=np.float32)
+
+    def encode(self, texts):
+        # Tokenizing and framework dispatch: Python work that holds the GIL
+        deadline = time.perf_counter() + self.call_overhead
+        while time.perf_counter() < deadline:
+            pass
+        x = np.ones((len(texts) * self.tokens_per_text, self.w1.shape[0]), dtype=np.float32)
+        x = np.maximum(x @ self.w1, 0) @ self.w2
+        return x.reshape(len(texts), self.tokens_per_text, -1).mean(axis=1)
+
+
+def load_encoder(synthetic):
+    if not synthetic:
+        try:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(MODEL_NAME)
+            return f"{MODEL_NAME}", lambda texts: model.encode(texts, convert_to_numpy=True)
+        except ImportError:
+            print("sentence-transformers is not installed; using the synthetic encoder")
+    return "synthetic encoder", SyntheticEncoder().encode
+
+
+def run(encode, concurrency, requests):
+    """Issue `requests` single-text encodes from `concurrency` threads; return (latencies, seconds)."""
+    per_thread = max(1, requests // concurrency)
+    latencies = [[] for _ in range(concurrency)]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(n):
+        barrier.wait()
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            encode([TEXT])
+            latencies[n].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    return np.concatenate(latencies) * 1000, time.perf_counter() - start
+
+
+def report(label, latencies, seconds, batch_size=None):
+    p50, p99 = np.percentile(latencies, [50, 99])
+    line = f"    {label:<14} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms   {len(latencies) / seconds:8.0f} req/s"
+    if batch_size is not None:
+        line += f"   mean batch {batch_size:5.1f}"
+    print(line)
+
+
+def main(concurrency_levels, requests, window, max_batch, synthetic):
+    name, encode = load_encoder(synthetic)
+    encode([TEXT])  # warm up
+    print(f"{requests} requests per level with {name} (window {window * 1000:.1f} ms, max batch {max_batch})")
+
+    for concurrency in concurrency_levels:
+        print(f"  {concurrency} concurrent callers")
+        latencies, seconds = run(encode, concurrency, requests)
+        report("unbatched", latencies, seconds)
+
+        batcher = EncodeBatcher(encode, window, max_batch)
+        latencies, seconds = run(batcher.encode, concurrency, requests)
+        report("micro-batched", latencies, seconds, batcher.texts / max(batcher.batches, 1))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark encode latency with and without micro-batching.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--requests", type=int, default=1024)
+    parser.add_argument("--window", type=float, default=ENCODE_BATCH_WINDOW, help="batch window in seconds")
+    parser.add_argument("--max-batch", type=int, default=ENCODE_MAX_BATCH)
+    parser.add_argument("--synthetic", action="store_true", help="use the stand-in encoder even if the model is installed")
+    args = parser.parse_args()
+    main(args.concurrency, args.requests, args.window, args.max_batch, args.synthetic)
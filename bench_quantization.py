@@ -0,0 +1,94 @@
+# script: bench_quantization.py
+# Recall, memory and query time of quantized index storage against float32.
+#
+#   python bench_quantization.py
+#   python bench_quantization.py --corpus 200000 --queries 500 --backend brute
+#   python bench_quantization.py --store    # use the saved campaign embeddings
+#
+# Ground truth is an exact float32 scan. Recall@k is the share of true top_k
+# hits above the threshold that each configuration returns. The synthetic
+# corpus is clustered around random topics so, like real campaign text,
+# many vectors sit near the threshold of their neighbours.
+import argparse
+import time
+
+import numpy as np
+
+from models.ann_index import QUANTIZATIONS, QUANTIZED_SCORE_MARGIN, RERANK_CANDIDATES, create_index, rerank_exact
+from models.embedding_store import normalize
+
+
+def synthetic_corpus(size, dim, topics, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = normalize(rng.standard_normal((topics, dim)))
+    vectors = centres[rng.integers(topics, size=size)] + 0.06 * rng.standard_normal((size, dim))
+    return normalize(vectors)
+
+
+def stored_corpus():
+    # The database layer is only loaded for --store, which reads the real embeddings
+    from db.embeddings import iter_open_embeddings
+    from models.dl_similarity import MODEL_NAME
+    chunks = [vectors for _, vectors in iter_open_embeddings(MODEL_NAME)]
+    if not chunks:
+        raise SystemExit("No stored embeddings; run update_embeddings_once.py first")
+    return np.concatenate(chunks)
+
+
+def recall(truth, found):
+    expected = sum(len(ids) for ids, _ in truth)
+    if not expected:
+        return 1.0
+    hits = sum(len(np.intersect1d(t, f)) for (t, _), (f, _) in zip(truth, found))
+    return hits / expected
+
+
+def main(corpus, queries, top_k, threshold, backend, use_store, rerank_factor, margin):
+    vectors = stored_corpus() if use_store else synthetic_corpus(corpus, 384, max(1, corpus // 200))
+    ids = np.arange(len(vectors), dtype=np.int64)
+    rng = np.random.default_rng(1)
+    # Queries are perturbed corpus vectors, like drafts close to existing campaigns
+    picked = vectors[rng.choice(len(vectors), queries, replace=False)]
+    query_matrix = normalize(picked + 0.04 * rng.standard_normal(picked.shape))
+
+    exact = create_index("brute", quantization="float32")
+    exact.add(ids, vectors)
+    truth = exact.search_batch(query_matrix, top_k, threshold)
+    print(f"{len(vectors)} vectors, {queries} queries, top_k={top_k}, threshold={threshold}, backend={backend}")
+    print(f"  {'storage':<22} {'memory':>10} {'query':>10} {'recall@k':>9} {'max score err':>14}")
+
+    for quantization in QUANTIZATIONS:
+        index = create_index(backend, quantization=quantization)
+        index.add(ids, vectors)
+        memory = index.memory_usage() / 1e6
+
+        start = time.perf_counter()
+        found = index.search_batch(query_matrix, top_k, threshold)
+        elapsed = (time.perf_counter() - start) / queries * 1000
+        errors = [np.abs(s - vectors[i] @ q).max() for (i, s), q in zip(found, query_matrix) if len(i)]
+        error = max(errors) if errors else 0.0
+        print(f"  {quantization:<22} {memory:8.1f}MB {elapsed:8.3f}ms {recall(truth, found):9.4f} {error:14.5f}")
+
+        if quantization == "float32":
+            continue
+        start = time.perf_counter()
+        candidates = index.search_batch(query_matrix, top_k * rerank_factor, threshold - margin)
+        found = rerank_exact(query_matrix, candidates, lambda hit_ids: vectors[hit_ids], top_k, threshold)
+        elapsed = (time.perf_counter() - start) / queries * 1000
+        label = f"{quantization} + re-rank"
+        print(f"  {label:<22} {memory:8.1f}MB {elapsed:8.3f}ms {recall(truth, found):9.4f} {0.0:14.5f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report recall of quantized index storage against float32.")
+    parser.add_argument("--corpus", type=int, default=100000, help="synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--backend", default="brute", choices=["brute", "ivf"])
+    parser.add_argument("--store", action="store_true", help="use the saved campaign embeddings instead")
+    parser.add_argument("--rerank-factor", type=int, default=RERANK_CANDIDATES)
+    parser.add_argument("--margin", type=float, default=QUANTIZED_SCORE_MARGIN)
+    args = parser.parse_args()
+    main(args.corpus, args.queries, args.top_k, args.threshold, args.backend, args.store,
+         args.rerank_factor, args.margin)
@@ -0,0 +1,45 @@
+# script: check_import_time.py
+# Checks that lightweight modules import quickly and do not pull in the ML stack.
+import subprocess
+import sys
+
+# Module -> (import time budget in seconds, heavy modules that must not be loaded)
+BUDGETS = {
+    "models.campaign": (1.0, ["torch", "sentence_transformers", "sklearn", "pandas"]),
+    "models.dl_similarity": (2.0, ["torch", "sentence_transformers", "sklearn"]),
+    "models.ml_predictor": (2.0, ["torch", "sentence_transformers", "sklearn"]),
+}
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed)
+print(",".join(loaded))
+"""
+
+
+def check(module, budget, heavy):
+    # Fresh interpreter per module so earlier imports do not hide the cost
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=heavy)],
+        capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    elapsed = float(output[-2])
+    loaded = [name for name in output[-1].split(",") if name]
+
+    ok = elapsed <= budget and not loaded
+    status = "✅" if ok else "❌"
+    print(f"{status} {module}: {elapsed:.3f}s (budget {budget:.1f}s)")
+    if loaded:
+        print(f"   eagerly imported: {', '.join(loaded)}")
+    return ok
+
+
+if __name__ == "__main__":
+    results = [check(module, budget, heavy) for module, (budget, heavy) in BUDGETS.items()]
+    if not all(results):
+        sys.exit(1)
+    print("✅ Import times within budget.")
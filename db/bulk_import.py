@@ -0,0 +1,232 @@
+# Bulk import of campaigns and donations from CSV or JSONL files
+#
+#   python -m db.bulk_import campaigns campaigns.csv
+#   python -m db.bulk_import donations donations.jsonl --chunk-size 100000
+#
+# Rows are streamed in chunks and inserted with executemany inside a single
+# transaction, so an import either lands completely or not at all.
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+
+from db import database
+
+BULK_CHUNK_SIZE = 50000
+
+CAMPAIGN_FIELDS = ('title', 'description', 'btc_address', 'target_amount', 'owner_name')
+DONATION_FIELDS = ('campaign_id', 'amount')
+
+
+def read_records(path, file_format=None):
+    """
+    Stream records from a CSV (with a header row) or JSON Lines file as dicts.
+
+    The format is taken from the file extension unless `file_format` is
+    'csv' or 'jsonl'.
+    """
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            yield from csv.DictReader(f)
+        elif file_format == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unknown import format: {file_format}")
+
+
+def _chunks(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _require(record, fields, line):
+    missing = [field for field in fields if record.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Record {line} is missing {', '.join(missing)}")
+
+
+def _optional(record, field):
+    value = record.get(field)
+    return None if value == '' else value
+
+
+def _campaign_row(record, line):
+    _require(record, CAMPAIGN_FIELDS, line)
+    return (
+        record['title'],
+        record['description'],
+        record['btc_address'],
+        float(record['target_amount']),
+        record['owner_name'],
+        float(_optional(record, 'current_amount') or 0.0),
+        _optional(record, 'status'),
+        _optional(record, 'created_at'),
+    )
+
+
+def _donation_row(record, line):
+    _require(record, DONATION_FIELDS, line)
+    campaign_id = int(record['campaign_id'])
+    return (campaign_id, float(record['amount']), _optional(record, 'created_at'), campaign_id)
+
+
+def _drop_maintenance(conn):
+    """
+    Drop the campaigns triggers and secondary indexes, returning their SQL.
+
+    Keeping them live would cost a trigger run and several index updates per
+    row; recreating them and rebuilding the derived tables once is far cheaper.
+    """
+    objects = conn.execute(
+        "SELECT type, name, sql FROM sqlite_master "
+        "WHERE tbl_name = 'campaigns' AND type IN ('trigger', 'index') AND sql IS NOT NULL"
+    ).fetchall()
+    for obj in objects:
+        conn.execute(f"DROP {obj['type'].upper()} {obj['name']}")
+    return [obj['sql'] for obj in objects]
+
+
+def _restore_maintenance(conn, statements):
+    """Recreate dropped triggers/indexes and rebuild what they would have maintained."""
+    for statement in statements:
+        conn.execute(statement)
+    conn.execute("INSERT INTO campaigns_fts (campaigns_fts) VALUES ('rebuild')")
+    for statement in database.STATS_REBUILD:
+        conn.execute(statement)
+    # The generation triggers were dropped too; record the import as one change
+    conn.execute(database.GENERATION_BUMP)
+
+
+def _queue_jobs(kinds):
+    """Queue background model jobs for the imported data and make sure a worker runs them."""
+    try:
+        from utils.job_queue import enqueue_job, start_worker_if_idle
+        for kind in kinds:
+            enqueue_job(kind)
+        start_worker_if_idle()
+    except Exception as e:
+        print(f"Could not queue background jobs: {e}")
+
+
+def bulk_import_campaigns(records, chunk_size=BULK_CHUNK_SIZE, defer_maintenance=True, progress=print):
+    """
+    Insert many campaigns in one transaction
+
+    Args:
+        records (iterable): dicts with title, description, btc_address, target_amount
+            and owner_name, plus optional current_amount, status and created_at
+        chunk_size (int): Rows passed to each executemany call
+        defer_maintenance (bool): Drop triggers and secondary indexes during the
+            import and rebuild them (and the search index and dashboard totals)
+            once at the end. Faster unless the import is small next to the table.
+        progress (callable): Called with a status message after each chunk, or None
+
+    Returns:
+        int: Number of campaigns imported
+    """
+    imported = 0
+    start = time.perf_counter()
+    with database.transaction() as conn:
+        deferred = _drop_maintenance(conn) if defer_maintenance else None
+        for chunk in _chunks(records, chunk_size):
+            rows = [_campaign_row(record, imported + i + 1) for i, record in enumerate(chunk)]
+            conn.executemany(f'''
+            INSERT INTO campaigns
+                (title, description, btc_address, target_amount, owner_name,
+                 current_amount, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, IFNULL(?, 'Active'), IFNULL(?, CURRENT_TIMESTAMP), {database.NOW})
+            ''', rows)
+            imported += len(rows)
+            if progress:
+                progress(f"Imported {imported} campaigns ({time.perf_counter() - start:.1f}s)")
+        if deferred is not None:
+            _restore_maintenance(conn, deferred)
+
+    if imported:
+        database.invalidate_cache()
+        database.export_to_csv()
+        from utils.job_queue import JOB_EMBED, JOB_TRAIN
+        _queue_jobs([JOB_TRAIN, JOB_EMBED])
+    return imported
+
+
+def bulk_import_donations(records, chunk_size=BULK_CHUNK_SIZE, progress=print):
+    """
+    Record many donations in one transaction and apply them to campaign totals
+
+    Donations are appended to the ledger in chunks, then every affected
+    campaign's total and status is updated once.
+
+    Args:
+        records (iterable): dicts with campaign_id and amount, plus optional created_at
+        chunk_size (int): Rows passed to each executemany call
+        progress (callable): Called with a status message after each chunk, or None
+
+    Returns:
+        tuple: (donations imported, donations skipped because their campaign does not exist)
+    """
+    seen = imported = 0
+    start = time.perf_counter()
+    with database.transaction() as conn:
+        first_id = conn.execute('SELECT IFNULL(MAX(id), 0) FROM donations').fetchone()[0]
+        for chunk in _chunks(records, chunk_size):
+            rows = [_donation_row(record, seen + i + 1) for i, record in enumerate(chunk)]
+            cursor = conn.executemany(f'''
+            INSERT INTO donations (campaign_id, amount, created_at)
+            SELECT ?, ?, IFNULL(?, {database.NOW})
+            WHERE EXISTS (SELECT 1 FROM campaigns WHERE id = ?)
+            ''', rows)
+            seen += len(rows)
+            imported += cursor.rowcount
+            if progress:
+                progress(f"Imported {imported} donations ({time.perf_counter() - start:.1f}s)")
+
+        conn.execute('''
+        UPDATE campaigns SET
+            current_amount = current_amount + totals.amount,
+            status = CASE WHEN current_amount + totals.amount >= target_amount THEN 'Funded' ELSE status END
+        FROM (
+            SELECT campaign_id, TOTAL(amount) AS amount FROM donations
+            WHERE id > ? GROUP BY campaign_id
+        ) AS totals
+        WHERE campaigns.id = totals.campaign_id
+        ''', (first_id,))
+
+    if imported:
+        database.invalidate_cache()
+        database.export_to_csv()
+        from utils.job_queue import JOB_TRAIN
+        _queue_jobs([JOB_TRAIN])
+    return imported, seen - imported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import campaigns or donations from CSV or JSONL.")
+    parser.add_argument("kind", choices=["campaigns", "donations"])
+    parser.add_argument("path", help="CSV file with a header row, or a .jsonl file")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="override the format implied by the extension")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE)
+    parser.add_argument("--no-defer", action="store_true",
+                        help="keep triggers and indexes live (faster for small imports into a large table)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        parser.error(f"{args.path} does not exist")
+
+    records = read_records(args.path, args.format)
+    started = time.perf_counter()
+    if args.kind == "campaigns":
+        count = bulk_import_campaigns(records, args.chunk_size, defer_maintenance=not args.no_defer)
+        print(f"Imported {count} campaigns in {time.perf_counter() - started:.1f}s")
+    else:
+        count, skipped = bulk_import_donations(records, args.chunk_size)
+        print(f"Imported {count} donations in {time.perf_counter() - started:.1f}s ({skipped} skipped: unknown campaign)")
@@ -1,158 +1,606 @@
 import sqlite3
 import os
-import pandas as pd
+import queue
+import re
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+from db.exporter import CsvExporter
+from utils.dataset import feather_path_for, pyarrow_available
+
 # Set the base directory to the parent of the current file
 BASE_DIR = Path(__file__).parent.parent
-DB_PATH = os.path.join(BASE_DIR, 'data', 'campaigns.db')
-CSV_PATH = os.path.join(BASE_DIR, 'data_exports', 'campaigns.csv')
+# Directory holding data/ and data_exports/; benchmarks point it at a scratch copy
+DATA_ROOT = os.environ.get('OPENFUNDS_DATA_ROOT', BASE_DIR)
+DB_PATH = os.path.join(DATA_ROOT, 'data', 'campaigns.db')
+CSV_PATH = os.path.join(DATA_ROOT, 'data_exports', 'campaigns.csv')
+FEATHER_PATH = feather_path_for(CSV_PATH)
+
+# Connection tuning applied to every connection we open
+BUSY_TIMEOUT = 30
+POOL_SIZE = 8
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-20000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+)
+
+# Idle connections per database path, reused across calls and threads
+_pools = {}
+_dirs_ready = False
+
+# Callables run after every write this process commits; utils.cache registers
+# its invalidation here so the DB layer does not depend on the cache
+_change_hooks = []
+
+# Read-only connection per database path used to poll PRAGMA data_version,
+# with the data_version and generation it last saw
+_generation_state = {}
+_generation_lock = threading.Lock()
+
+# Timestamp with millisecond precision, used to stamp changed rows
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# Funding progress as a ratio of the target, computed by the progress column
+PROGRESS_EXPR = 'CASE WHEN target_amount > 0 THEN current_amount / target_amount ELSE 0 END'
+
+# Sort name -> key column/expression; every sort breaks ties on id, newest first
+PAGE_SORTS = {
+    'newest': 'created_at',
+    'highest_funded': 'current_amount',
+    'closest_to_goal': 'progress',
+}
+
+# bm25 column weights for search relevance: title, description, owner_name
+FTS_WEIGHTS = '10.0, 1.0, 5.0'
+
+# Trigger bodies keeping campaign_stats in step with the campaigns table
+STATS_ADD_NEW = '''
+INSERT INTO campaign_stats (status, campaign_count, total_raised, total_target)
+VALUES (IFNULL(NEW.status, ''), 1, IFNULL(NEW.current_amount, 0), NEW.target_amount)
+ON CONFLICT (status) DO UPDATE SET
+    campaign_count = campaign_count + 1,
+    total_raised = total_raised + excluded.total_raised,
+    total_target = total_target + excluded.total_target;
+'''
+STATS_REMOVE_OLD = '''
+UPDATE campaign_stats SET
+    campaign_count = campaign_count - 1,
+    total_raised = total_raised - IFNULL(OLD.current_amount, 0),
+    total_target = total_target - OLD.target_amount
+WHERE status = IFNULL(OLD.status, '');
+'''
+
+# Recompute campaign_stats from scratch
+STATS_REBUILD = (
+    'DELETE FROM campaign_stats',
+    '''
+    INSERT INTO campaign_stats (status, campaign_count, total_raised, total_target)
+    SELECT IFNULL(status, ''), COUNT(*), TOTAL(current_amount), TOTAL(target_amount)
+    FROM campaigns GROUP BY IFNULL(status, '')
+    ''',
+)
+
+# Statement run by the campaigns triggers (and bulk imports) to mark a change
+GENERATION_BUMP = 'UPDATE data_generation SET generation = generation + 1 WHERE id = 1'
+
+# Schema migrations applied in order; PRAGMA user_version counts how many have run
+MIGRATIONS = [
+    # 1: updated_at stamp on every insert and update, the watermark the
+    # similarity index syncs from (models/dl_similarity.py)
+    [
+        'ALTER TABLE campaigns ADD COLUMN updated_at TIMESTAMP',
+        'UPDATE campaigns SET updated_at = created_at',
+        'CREATE INDEX IF NOT EXISTS idx_campaigns_updated_at ON campaigns (updated_at)',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS campaigns_touch_insert AFTER INSERT ON campaigns
+        BEGIN
+            UPDATE campaigns SET updated_at = {NOW} WHERE id = NEW.id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS campaigns_touch_update AFTER UPDATE ON campaigns
+        WHEN NEW.updated_at IS OLD.updated_at
+        BEGIN
+            UPDATE campaigns SET updated_at = {NOW} WHERE id = NEW.id;
+        END
+        ''',
+    ],
+    # 2: indexes backing keyset pagination for each listing sort
+    [
+        'CREATE INDEX IF NOT EXISTS idx_campaigns_created ON campaigns (created_at DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_campaigns_amount ON campaigns (current_amount DESC, id DESC)',
+        f'CREATE INDEX IF NOT EXISTS idx_campaigns_progress ON campaigns (({PROGRESS_EXPR}) DESC, id DESC)',
+    ],
+    # 3: progress column, status-first listing indexes and full-text search.
+    # SQLite cannot add a STORED generated column to an existing table, so
+    # progress is VIRTUAL; its index stores the computed values.
+    [
+        f'ALTER TABLE campaigns ADD COLUMN progress REAL GENERATED ALWAYS AS ({PROGRESS_EXPR}) VIRTUAL',
+        'DROP INDEX IF EXISTS idx_campaigns_progress',
+        'CREATE INDEX IF NOT EXISTS idx_campaigns_progress ON campaigns (progress DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_campaigns_status_created ON campaigns (status, created_at DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_campaigns_status_amount ON campaigns (status, current_amount DESC, id DESC)',
+        'CREATE INDEX IF NOT EXISTS idx_campaigns_status_progress ON campaigns (status, progress DESC, id DESC)',
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS campaigns_fts USING fts5(
+            title, description, owner_name,
+            content='campaigns', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS campaigns_fts_insert AFTER INSERT ON campaigns
+        BEGIN
+            INSERT INTO campaigns_fts (rowid, title, description, owner_name)
+            VALUES (NEW.id, NEW.title, NEW.description, NEW.owner_name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS campaigns_fts_delete AFTER DELETE ON campaigns
+        BEGIN
+            INSERT INTO campaigns_fts (campaigns_fts, rowid, title, description, owner_name)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.owner_name);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS campaigns_fts_update AFTER UPDATE OF title, description, owner_name ON campaigns
+        BEGIN
+            INSERT INTO campaigns_fts (campaigns_fts, rowid, title, description, owner_name)
+            VALUES ('delete', OLD.id, OLD.title, OLD.description, OLD.owner_name);
+            INSERT INTO campaigns_fts (rowid, title, description, owner_name)
+            VALUES (NEW.id, NEW.title, NEW.description, NEW.owner_name);
+        END
+        ''',
+        "INSERT INTO campaigns_fts (campaigns_fts) VALUES ('rebuild')",
+    ],
+    # 4: per-status dashboard totals maintained by triggers
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS campaign_stats (
+            status TEXT PRIMARY KEY,
+            campaign_count INTEGER NOT NULL DEFAULT 0,
+            total_raised REAL NOT NULL DEFAULT 0,
+            total_target REAL NOT NULL DEFAULT 0
+        )
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS campaign_stats_insert AFTER INSERT ON campaigns
+        BEGIN
+            {STATS_ADD_NEW}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS campaign_stats_delete AFTER DELETE ON campaigns
+        BEGIN
+            {STATS_REMOVE_OLD}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS campaign_stats_update
+        AFTER UPDATE OF status, current_amount, target_amount ON campaigns
+        BEGIN
+            {STATS_REMOVE_OLD}
+            {STATS_ADD_NEW}
+        END
+        ''',
+        *STATS_REBUILD,
+    ],
+    # 5: donations ledger
+    [
+        f'''
+        CREATE TABLE IF NOT EXISTS donations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            campaign_id INTEGER NOT NULL REFERENCES campaigns (id),
+            amount REAL NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT ({NOW})
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_donations_campaign ON donations (campaign_id, created_at)',
+    ],
+    # 6: generation counter bumped by every change to campaigns
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS data_generation (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL
+        )
+        ''',
+        'INSERT OR IGNORE INTO data_generation (id, generation) VALUES (1, 0)',
+        *[
+            f'''
+            CREATE TRIGGER IF NOT EXISTS campaigns_generation_{event.lower()} AFTER {event} ON campaigns
+            BEGIN
+                {GENERATION_BUMP};
+            END
+            '''
+            for event in ('INSERT', 'UPDATE', 'DELETE')
+        ],
+    ],
+    # 7: campaign embeddings for the similarity recommender. checked_at is
+    # the campaign's updated_at when content_hash was last compared with its
+    # text, so only rows touched since then need hashing again; embedded_at
+    # is when the vector was stored, so readers can pick up new vectors. Both
+    # precede the vector so filtering on them never reads the BLOB's overflow
+    # pages.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS campaign_embeddings (
+            campaign_id INTEGER PRIMARY KEY,
+            model TEXT NOT NULL,
+            content_hash TEXT NOT NULL,
+            checked_at TIMESTAMP,
+            embedded_at TIMESTAMP,
+            vector BLOB NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_campaign_embeddings_embedded ON campaign_embeddings (embedded_at)',
+        '''
+        CREATE TRIGGER IF NOT EXISTS campaign_embeddings_delete AFTER DELETE ON campaigns
+        BEGIN
+            DELETE FROM campaign_embeddings WHERE campaign_id = OLD.id;
+        END
+        ''',
+    ],
+]
 
 def ensure_dirs_exist():
     """Ensure the data and data_exports directories exist."""
-    os.makedirs(os.path.join(BASE_DIR, 'data'), exist_ok=True)
-    os.makedirs(os.path.join(BASE_DIR, 'data_exports'), exist_ok=True)
+    os.makedirs(os.path.join(DATA_ROOT, 'data'), exist_ok=True)
+    os.makedirs(os.path.join(DATA_ROOT, 'data_exports'), exist_ok=True)
 
-def get_db_connection():
-    """Create a database connection and return the connection object."""
-    ensure_dirs_exist()
-    conn = sqlite3.connect(DB_PATH)
+def _open_connection():
+    """Open a tuned connection in autocommit mode; transactions are explicit."""
+    global _dirs_ready
+    if not _dirs_ready:
+        ensure_dirs_exist()
+        _dirs_ready = True
+
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+def get_db_connection():
+    """Create a dedicated database connection that the caller must close."""
+    return _open_connection()
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection for the duration of the block."""
+    pool = _pools.setdefault(DB_PATH, queue.LifoQueue(maxsize=POOL_SIZE))
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+@contextmanager
+def transaction(immediate=True):
+    """
+    Run the block in one transaction on a pooled connection.
+
+    Commits when the block finishes and rolls back if it raises. BEGIN
+    IMMEDIATE takes the write lock up front, so concurrent writers wait on
+    the busy timeout instead of failing with "database is locked" mid-way.
+    """
+    with connection() as conn:
+        conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+def _migrate(conn):
+    """Apply any schema migrations this database has not seen yet."""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(f'PRAGMA user_version = {number}')
+
+def close_all_connections():
+    """Close every idle pooled connection."""
+    with _generation_lock:
+        for conn, _, _ in _generation_state.values():
+            conn.close()
+        _generation_state.clear()
+    for pool in _pools.values():
+        while True:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
 def init_db():
     """Initialize the database by creating necessary tables if they don't exist."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Create campaigns table if it doesn't exist
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS campaigns (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        title TEXT NOT NULL,
-        description TEXT NOT NULL,
-        btc_address TEXT NOT NULL,
-        target_amount REAL NOT NULL,
-        current_amount REAL DEFAULT 0.0,
-        owner_name TEXT NOT NULL,
-        status TEXT DEFAULT 'Active',
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        # Create campaigns table if it doesn't exist
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS campaigns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            btc_address TEXT NOT NULL,
+            target_amount REAL NOT NULL,
+            current_amount REAL DEFAULT 0.0,
+            owner_name TEXT NOT NULL,
+            status TEXT DEFAULT 'Active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        _migrate(conn)
     
-    # Initialize CSV export
-    export_to_csv()
+    # Create a missing CSV (or Arrow) export in the background rather than
+    # during import; write paths keep it current after that. pyarrow is
+    # only probed when the Arrow file is absent.
+    if not os.path.exists(CSV_PATH) or (not os.path.exists(FEATHER_PATH) and pyarrow_available()):
+        schedule_export()
 
 def add_campaign(title, description, btc_address, target_amount, owner_name):
     """Add a new campaign to the database."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO campaigns (title, description, btc_address, target_amount, owner_name)
-    VALUES (?, ?, ?, ?, ?)
-    ''', (title, description, btc_address, target_amount, owner_name))
-    
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute('''
+        INSERT INTO campaigns (title, description, btc_address, target_amount, owner_name)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (title, description, btc_address, target_amount, owner_name))
     
-    # Export to CSV after adding a campaign
-    export_to_csv()
+    # Refresh caches and export to CSV in the background after adding a campaign
+    record_change()
     
     return True
 
 def get_all_campaigns():
     """Retrieve all campaigns from the database."""
-    conn = get_db_connection()
-    campaigns = conn.execute('SELECT * FROM campaigns ORDER BY created_at DESC').fetchall()
-    conn.close()
-    
-    return campaigns
+    with connection() as conn:
+        return conn.execute('SELECT * FROM campaigns ORDER BY created_at DESC').fetchall()
+
+def _fts_query(text):
+    """
+    Turn free text into a safe FTS5 query, or None if it has no words.
+
+    Words are quoted so FTS5 operators in the input are ignored; the last
+    word also matches as a prefix since it may still be being typed.
+    """
+    tokens = [f'"{token}"' for token in re.findall(r'\w+', text)]
+    if not tokens:
+        return None
+    tokens[-1] += '*'
+    return ' '.join(tokens)
+
+def _fetch_page(select, conditions, params, order, cursor_condition, cursor, limit):
+    """Run a keyset-paginated query whose rows carry a sort_key column."""
+    if cursor is not None:
+        conditions = conditions + [cursor_condition]
+        params = params + list(cursor)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    with connection() as conn:
+        rows = conn.execute(f'{select} {where} ORDER BY {order} LIMIT ?', (*params, limit + 1)).fetchall()
+
+    # The extra row only tells us whether another page exists
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, (last['sort_key'], last['id'])
+    return rows, None
+
+def get_campaigns_page(cursor=None, limit=20, sort='newest', status=None, search=None):
+    """
+    Retrieve one page of campaigns using keyset pagination.
+
+    Args:
+        cursor (tuple): (sort key, id) returned with the previous page, or None for the first page
+        limit (int): Maximum number of campaigns on the page
+        sort (str): 'newest', 'highest_funded' or 'closest_to_goal'
+        status (str): Only return campaigns with this status, if given
+        search (str): Only return campaigns matching this full-text query, if given
+
+    Returns:
+        tuple: (list of campaign rows, cursor for the next page or None if this is the last page)
+    """
+    if search:
+        return search_campaigns(search, status, sort, limit, cursor)
+    if sort not in PAGE_SORTS:
+        raise ValueError(f"Unknown sort: {sort}")
+    key = PAGE_SORTS[sort]
+
+    conditions, params = [], []
+    if status:
+        conditions.append('status = ?')
+        params.append(status)
+    return _fetch_page(
+        f'SELECT *, {key} AS sort_key FROM campaigns', conditions, params,
+        f'{key} DESC, id DESC', f'({key}, id) < (?, ?)', cursor, limit,
+    )
+
+def search_campaigns(query, status=None, sort='relevance', limit=20, cursor=None):
+    """
+    Full-text search over campaign titles, descriptions and owner names.
+
+    Every word of the query must appear in the campaign; the last word
+    matches as a prefix, so results keep up while the user is typing.
+
+    Args:
+        query (str): Free-text search
+        status (str): Only return campaigns with this status, if given
+        sort (str): 'relevance' or any get_campaigns_page sort
+        limit (int): Maximum number of campaigns on the page
+        cursor (tuple): Cursor returned with the previous page, or None for the first page
+
+    Returns:
+        tuple: (list of campaign rows, cursor for the next page or None if this is the last page)
+    """
+    match = _fts_query(query)
+    if match is None:
+        return get_campaigns_page(cursor, limit, 'newest' if sort == 'relevance' else sort, status)
+
+    if sort == 'relevance':
+        # bm25 scores are negative, best match first; titles weigh most
+        rank = f'bm25(campaigns_fts, {FTS_WEIGHTS})'
+        conditions, params = ['campaigns_fts MATCH ?'], [match]
+        if status:
+            conditions.append('campaigns.status = ?')
+            params.append(status)
+        return _fetch_page(
+            f'SELECT campaigns.*, {rank} AS sort_key FROM campaigns_fts '
+            'JOIN campaigns ON campaigns.id = campaigns_fts.rowid',
+            conditions, params,
+            'sort_key, campaigns.id', f'({rank}, campaigns.id) > (?, ?)', cursor, limit,
+        )
+
+    if sort not in PAGE_SORTS:
+        raise ValueError(f"Unknown sort: {sort}")
+    key = PAGE_SORTS[sort]
+    conditions, params = ['id IN (SELECT rowid FROM campaigns_fts WHERE campaigns_fts MATCH ?)'], [match]
+    if status:
+        conditions.append('status = ?')
+        params.append(status)
+    return _fetch_page(
+        f'SELECT *, {key} AS sort_key FROM campaigns', conditions, params,
+        f'{key} DESC, id DESC', f'({key}, id) < (?, ?)', cursor, limit,
+    )
+
+def get_dashboard_stats():
+    """
+    Read the dashboard totals maintained by the campaign_stats triggers.
+
+    Returns:
+        dict: total_campaigns, total_raised and total_target across all
+        campaigns, plus by_status mapping each status to its count, raised
+        and target totals
+    """
+    with connection() as conn:
+        rows = conn.execute('SELECT * FROM campaign_stats WHERE campaign_count > 0').fetchall()
+
+    by_status = {
+        row['status']: {
+            'count': row['campaign_count'],
+            'raised': row['total_raised'],
+            'target': row['total_target'],
+        }
+        for row in rows
+    }
+    return {
+        'total_campaigns': sum(stats['count'] for stats in by_status.values()),
+        'total_raised': sum(stats['raised'] for stats in by_status.values()),
+        'total_target': sum(stats['target'] for stats in by_status.values()),
+        'by_status': by_status,
+    }
+
+def get_data_generation():
+    """
+    Return a number that increases whenever the campaigns table changes.
+
+    PRAGMA data_version on a connection that never writes changes whenever
+    any other connection (in this or another process) commits, so the
+    persisted generation is only re-read after some commit has happened;
+    otherwise this costs no table reads at all.
+    """
+    with _generation_lock:
+        conn, data_version, generation = _generation_state.get(DB_PATH, (None, None, None))
+        if conn is None:
+            conn = _open_connection()
+        current = conn.execute('PRAGMA data_version').fetchone()[0]
+        if current != data_version:
+            generation = conn.execute('SELECT generation FROM data_generation WHERE id = 1').fetchone()[0]
+        _generation_state[DB_PATH] = (conn, current, generation)
+        return generation
 
 def get_campaign_by_id(campaign_id):
     """Retrieve a specific campaign by its ID."""
-    conn = get_db_connection()
-    campaign = conn.execute('SELECT * FROM campaigns WHERE id = ?', (campaign_id,)).fetchone()
-    conn.close()
-    
-    return campaign
+    with connection() as conn:
+        return conn.execute('SELECT * FROM campaigns WHERE id = ?', (campaign_id,)).fetchone()
 
 def update_campaign_status(campaign_id, status):
     """Update the status of a campaign."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with transaction() as conn:
+        conn.execute('UPDATE campaigns SET status = ? WHERE id = ?', (status, campaign_id))
     
-    cursor.execute('UPDATE campaigns SET status = ? WHERE id = ?', (status, campaign_id))
-    
-    conn.commit()
-    conn.close()
-    
-    # Export to CSV after updating campaign status
-    export_to_csv()
+    # Refresh caches and export to CSV in the background after updating campaign status
+    record_change()
     
     return True
 
-def donate_to_campaign(campaign_id, amount):
-    """Add a donation to a campaign and update its status if needed."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get current campaign info
-    campaign = cursor.execute(
-        'SELECT current_amount, target_amount FROM campaigns WHERE id = ?', 
-        (campaign_id,)
-    ).fetchone()
-    
+def apply_donation(conn, campaign_id, amount):
+    """
+    Add a donation inside the caller's write transaction.
+
+    The amount is added and the Funded status set by one UPDATE, so
+    concurrent donations never overwrite each other's totals, and the
+    donation is appended to the ledger.
+
+    Returns:
+        bool: False if the campaign does not exist
+    """
+    campaign = conn.execute('''
+    UPDATE campaigns SET
+        current_amount = current_amount + :amount,
+        status = CASE WHEN current_amount + :amount >= target_amount THEN 'Funded' ELSE status END
+    WHERE id = :id
+    RETURNING current_amount, status
+    ''', {'amount': amount, 'id': campaign_id}).fetchall()
+
     if not campaign:
-        conn.close()
         return False
-    
-    new_amount = campaign['current_amount'] + amount
-    
-    # Update current amount
-    cursor.execute(
-        'UPDATE campaigns SET current_amount = ? WHERE id = ?', 
-        (new_amount, campaign_id)
-    )
-    
-    # Check if campaign is now fully funded
-    if new_amount >= campaign['target_amount']:
-        cursor.execute(
-            'UPDATE campaigns SET status = ? WHERE id = ?', 
-            ('Funded', campaign_id)
-        )
-    
-    conn.commit()
-    conn.close()
-    
-    # Export to CSV after donation
-    export_to_csv()
-    
+
+    conn.execute('INSERT INTO donations (campaign_id, amount) VALUES (?, ?)', (campaign_id, amount))
     return True
 
-def export_to_csv():
-    """Export all campaigns data to a CSV file."""
-    conn = get_db_connection()
-    
-    # Check if there are any campaigns in the database
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='campaigns'")
-    if not cursor.fetchone():
-        conn.close()
-        return False
-    
-    # Query all campaigns
-    campaigns_df = pd.read_sql_query("SELECT * FROM campaigns", conn)
-    conn.close()
+def donate_to_campaign(campaign_id, amount):
+    """Add a donation to a campaign in its own transaction and update its status if needed."""
+    with transaction() as conn:
+        if not apply_donation(conn, campaign_id, amount):
+            return False
     
-    # Save to CSV
-    ensure_dirs_exist()
-    campaigns_df.to_csv(CSV_PATH, index=False)
+    # Refresh caches and export to CSV in the background after donation
+    record_change()
     
     return True
 
+# Shared exporter for the CSV and its Arrow copy; skips exports while the data generation is unchanged
+_exporter = CsvExporter(CSV_PATH, connection, generation=get_data_generation, feather_path=FEATHER_PATH)
+
+def export_to_csv():
+    """Bring the CSV export up to date now."""
+    return _exporter.export()
+
+def schedule_export():
+    """Export to CSV off the write path, coalescing bursts of writes."""
+    _exporter.schedule()
+
+def register_change_hook(hook):
+    """Call `hook()` after every write this process commits."""
+    _change_hooks.append(hook)
+
+def invalidate_cache():
+    """Run the registered change hooks, dropping this process's cached reads."""
+    for hook in _change_hooks:
+        hook()
+
+def record_change():
+    """Drop this process's cached reads and schedule a CSV export after a committed write."""
+    invalidate_cache()
+    schedule_export()
+
+def flush_exports():
+    """Run any pending background export immediately."""
+    _exporter.flush()
+
 # Initialize the database when this module is imported
-init_db()
\ No newline at end of file
+init_db()
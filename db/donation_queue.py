@@ -0,0 +1,168 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from db import database
+
+# A batch commits once it has waited this long or holds this many donations
+GROUP_COMMIT_INTERVAL = 0.001
+GROUP_COMMIT_MAX_BATCH = 256
+
+# How long donate() waits for its batch to commit
+DONATION_TIMEOUT = 30
+
+_STOP = object()
+
+
+class DonationQueue:
+    """
+    Write-behind queue that group-commits donations.
+
+    submit() hands a donation to a background thread and returns a Future.
+    The thread collects donations for up to `interval` seconds (or until
+    `max_batch` are waiting) and applies them all in one write transaction,
+    so a burst pays for one lock acquisition and one commit instead of one
+    per donation. If a batch fails it is retried donation by donation, so
+    an error only reaches the Future of the donation that caused it.
+    Futures resolve only after their donation has committed.
+    """
+
+    def __init__(self, interval=GROUP_COMMIT_INTERVAL, max_batch=GROUP_COMMIT_MAX_BATCH):
+        self.interval = interval
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def submit(self, campaign_id, amount):
+        """
+        Queue a donation
+
+        Returns:
+            Future: resolves to True once committed, False if the campaign does not exist
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Donation queue is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="donation-queue", daemon=True)
+                self._thread.start()
+            self._queue.put((campaign_id, amount, future))
+        return future
+
+    def donate(self, campaign_id, amount, timeout=DONATION_TIMEOUT):
+        """Queue a donation and wait for its batch to commit."""
+        return self.submit(campaign_id, amount).result(timeout)
+
+    def flush(self, timeout=DONATION_TIMEOUT):
+        """Wait until every donation submitted so far has been committed."""
+        with self._lock:
+            if self._thread is None:
+                return
+            marker = Future()
+            self._queue.put(marker)
+        marker.result(timeout)
+
+    def close(self):
+        """Commit everything still queued and stop the background thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, markers = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, Future):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+
+                remaining = deadline - time.monotonic()
+                if stopping or len(batch) >= self.max_batch or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if stopping:
+                # Drain whatever was queued before close()
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, Future):
+                        markers.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+
+            try:
+                if batch:
+                    self._commit(batch)
+            except Exception as e:
+                # This thread is the only one committing; it must outlive any batch
+                print(f"Error committing donations: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            for marker in markers:
+                marker.set_result(None)
+
+    def _commit(self, batch):
+        try:
+            with database.transaction() as conn:
+                results = [database.apply_donation(conn, campaign_id, amount) for campaign_id, amount, _ in batch]
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"Error committing donation: {e}")
+                batch[0][2].set_exception(e)
+                return
+            # Something in the batch failed and rolled everything back; retry
+            # one at a time so only the failing donation reports the error
+            for item in batch:
+                self._commit([item])
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+        try:
+            database.record_change()
+        except Exception as e:
+            # The donations are committed; a failed cache drop or export schedule must not undo that
+            print(f"Error recording donation change: {e}")
+
+
+_donation_queue = None
+_donation_queue_lock = threading.Lock()
+
+
+def get_donation_queue():
+    """Return the process-wide donation queue, creating it on first use."""
+    global _donation_queue
+    with _donation_queue_lock:
+        if _donation_queue is None:
+            _donation_queue = DonationQueue()
+        return _donation_queue
+
+
+def donate(campaign_id, amount):
+    """Add a donation through the shared group-commit queue and wait for it to commit."""
+    return get_donation_queue().donate(campaign_id, amount)
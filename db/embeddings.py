@@ -0,0 +1,156 @@
+# Stored campaign embeddings for the similarity recommender
+#
+# Vectors live in the campaign_embeddings table as little-endian float32
+# BLOBs keyed by campaign id, together with the model that produced them and
+# a hash of the text they were computed from. Readers load ids and vectors
+# only; titles and descriptions are fetched for the final hits.
+import numpy as np
+
+from db import database
+
+EMBEDDING_DTYPE = np.dtype('<f4')
+LOAD_CHUNK_SIZE = 50000
+
+# SQLite caps bound parameters per statement; id lists are split below it
+_MAX_IDS_PER_QUERY = 900
+
+
+def vector_to_blob(vector):
+    return np.ascontiguousarray(vector, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def blob_to_vector(blob):
+    return np.frombuffer(blob, dtype=EMBEDDING_DTYPE)
+
+
+def _id_chunks(ids):
+    ids = [int(campaign_id) for campaign_id in ids]
+    for start in range(0, len(ids), _MAX_IDS_PER_QUERY):
+        chunk = ids[start:start + _MAX_IDS_PER_QUERY]
+        yield chunk, ', '.join('?' * len(chunk))
+
+
+def get_latest_update():
+    """Return the newest campaigns.updated_at, or None if there are no campaigns."""
+    with database.connection() as conn:
+        return conn.execute('SELECT MAX(updated_at) FROM campaigns').fetchone()[0]
+
+
+def get_latest_embedding(model):
+    """Return the newest embedded_at from `model`, or None if nothing is stored."""
+    with database.connection() as conn:
+        return conn.execute(
+            'SELECT MAX(embedded_at) FROM campaign_embeddings WHERE model = ?', (model,)
+        ).fetchone()[0]
+
+
+# Campaigns with what is stored for them (NULLs when there is no embedding from the model)
+_CHANGED_SELECT = '''
+SELECT c.id, c.title, c.description, c.status, c.updated_at, e.content_hash, e.checked_at, e.vector
+FROM campaigns c
+LEFT JOIN campaign_embeddings e ON e.campaign_id = c.id AND e.model = ?
+'''
+
+
+def get_changed_campaigns(model, since=None):
+    """
+    Campaigns whose embedding may need work, with what is stored for them
+
+    Without `since`, returns campaigns that have no embedding from `model`
+    or were updated after their stored hash was last checked. With it,
+    returns every campaign updated at or after `since`.
+
+    Returns:
+        list: rows with id, title, description, status, updated_at, and the
+        stored content_hash, checked_at and vector (NULL when there is no
+        embedding from `model`)
+    """
+    with database.connection() as conn:
+        if since is None:
+            return conn.execute(
+                f'{_CHANGED_SELECT} WHERE e.campaign_id IS NULL OR e.checked_at IS NOT c.updated_at', (model,)
+            ).fetchall()
+        return conn.execute(f'{_CHANGED_SELECT} WHERE c.updated_at >= ?', (model, since)).fetchall()
+
+
+def get_embedded_campaigns(model, since=None):
+    """Campaigns whose embedding from `model` was stored at or after `since` (all if None), as get_changed_campaigns."""
+    with database.connection() as conn:
+        return conn.execute(
+            f'{_CHANGED_SELECT} WHERE e.embedded_at >= ?', (model, since or '')
+        ).fetchall()
+
+
+def save_embeddings(model, rows):
+    """
+    Store freshly computed embeddings
+
+    Args:
+        model (str): Name of the model that produced the vectors
+        rows (iterable): (campaign_id, content_hash, vector, checked_at) tuples
+    """
+    with database.transaction() as conn:
+        conn.executemany(f'''
+        INSERT INTO campaign_embeddings (campaign_id, model, content_hash, vector, checked_at, embedded_at)
+        VALUES (?, ?, ?, ?, ?, {database.NOW})
+        ON CONFLICT (campaign_id) DO UPDATE SET
+            model = excluded.model,
+            content_hash = excluded.content_hash,
+            vector = excluded.vector,
+            checked_at = excluded.checked_at,
+            embedded_at = excluded.embedded_at
+        ''', [
+            (campaign_id, model, content, vector_to_blob(vector), checked_at)
+            for campaign_id, content, vector, checked_at in rows
+        ])
+
+
+def mark_checked(rows):
+    """Record that stored hashes still match; `rows` are (campaign_id, checked_at) pairs."""
+    with database.transaction() as conn:
+        conn.executemany(
+            'UPDATE campaign_embeddings SET checked_at = ? WHERE campaign_id = ?',
+            [(checked_at, campaign_id) for campaign_id, checked_at in rows],
+        )
+
+
+def iter_open_embeddings(model, chunk_size=LOAD_CHUNK_SIZE):
+    """Yield (ids, vectors) arrays for campaigns that are not closed, `chunk_size` rows at a time."""
+    with database.connection() as conn:
+        cursor = conn.execute('''
+        SELECT e.campaign_id, e.vector
+        FROM campaign_embeddings e JOIN campaigns c ON c.id = e.campaign_id
+        WHERE e.model = ? AND LOWER(IFNULL(c.status, '')) != 'closed'
+        ''', (model,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            vectors = np.frombuffer(b''.join(row[1] for row in rows), dtype=EMBEDDING_DTYPE)
+            yield ids, vectors.reshape(len(rows), -1)
+
+
+def get_embeddings(ids, model):
+    """Return {campaign_id: vector} for the given ids that have an embedding from `model`."""
+    found = {}
+    with database.connection() as conn:
+        for chunk, marks in _id_chunks(ids):
+            rows = conn.execute(
+                f'SELECT campaign_id, vector FROM campaign_embeddings WHERE model = ? AND campaign_id IN ({marks})',
+                [model, *chunk],
+            )
+            for campaign_id, vector in rows:
+                found[campaign_id] = blob_to_vector(vector)
+    return found
+
+
+def get_campaign_texts(ids):
+    """Return {campaign_id: (title, description)} for the given ids that exist."""
+    found = {}
+    with database.connection() as conn:
+        for chunk, marks in _id_chunks(ids):
+            rows = conn.execute(f'SELECT id, title, description FROM campaigns WHERE id IN ({marks})', chunk)
+            for campaign_id, title, description in rows:
+                found[campaign_id] = (title, description)
+    return found
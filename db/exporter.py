@@ -0,0 +1,194 @@
+import atexit
+import csv
+import gzip
+import io
+import os
+import threading
+
+from utils.dataset import pyarrow_available, write_feather_from_csv
+
+# Write bursts are coalesced into one export at most this long after the first write
+EXPORT_DEBOUNCE_SECONDS = 1.0
+
+# Rows fetched from SQLite and written per step; bounds the exporter's memory
+EXPORT_CHUNK_SIZE = 10000
+
+# Columns of the public export, as the campaigns table was originally laid
+# out; internal columns added since (updated_at, progress) are left out
+EXPORT_COLUMNS = (
+    'id', 'title', 'description', 'btc_address', 'target_amount',
+    'current_amount', 'owner_name', 'status', 'created_at',
+)
+
+# Compression name -> file suffix
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+def _open_zstd(path):
+    """Open a zstd-compressed text stream, using the stdlib module when available."""
+    try:
+        from compression import zstd
+        return zstd.open(path, 'wt', encoding='utf-8', newline='')
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression needs Python 3.14+ or the zstandard package")
+    raw = open(path, 'wb')
+    return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw), encoding='utf-8', newline='')
+
+
+def _open_output(path, compression):
+    if compression is None:
+        return open(path, 'w', newline='', encoding='utf-8')
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', newline='', encoding='utf-8')
+    if compression == 'zstd':
+        return _open_zstd(path)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def write_campaigns(conn, csv_path, feather_path=None, compression=None, chunk_size=EXPORT_CHUNK_SIZE,
+                    progress=None):
+    """
+    Stream the EXPORT_COLUMNS of the campaigns table to `csv_path` and rename it into place
+
+    Rows come from one read snapshot `chunk_size` at a time, so memory use
+    does not grow with the table and readers never see a partial file. If
+    `feather_path` is given and pyarrow is installed, the finished CSV is
+    then converted to an Arrow file there (uncompressed CSVs only).
+
+    Args:
+        conn (sqlite3.Connection): Connection to read from
+        csv_path (str): Destination, used as given
+        feather_path (str): Arrow copy to write after the CSV, or None
+        compression (str): None, 'gzip' or 'zstd'
+        chunk_size (int): Rows fetched and written per step
+        progress (callable): Called as progress(rows_written, total_rows) after each chunk
+
+    Returns:
+        int: number of campaigns written
+    """
+    total = conn.execute('SELECT COUNT(*) FROM campaigns').fetchone()[0] if progress else None
+
+    # One statement reads one consistent snapshot, however long the export takes
+    columns = list(EXPORT_COLUMNS)
+    cursor = conn.execute(f"SELECT {', '.join(columns)} FROM campaigns ORDER BY id")
+
+    tmp_path = f"{csv_path}.{os.getpid()}.tmp"
+    written = 0
+    try:
+        with _open_output(tmp_path, compression) as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                written += len(rows)
+                if progress:
+                    progress(written, total)
+        os.replace(tmp_path, csv_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Written after the CSV so readers can tell it is at least as fresh
+    if feather_path and compression is None and pyarrow_available():
+        types = {row['name']: row['type'] for row in conn.execute('PRAGMA table_xinfo(campaigns)')}
+        try:
+            write_feather_from_csv(csv_path, feather_path, columns, types)
+        except Exception as e:
+            print(f"Error exporting campaigns to Arrow: {e}")
+    return written
+
+
+class CsvExporter:
+    """
+    Keeps the campaigns CSV export current off the write path.
+
+    Writers call schedule(), which coalesces bursts into a single export on
+    a background timer. Each export streams the table through
+    write_campaigns(), so memory use does not grow with the table, rows
+    deleted from campaigns drop out, and readers always see a complete
+    file. When `feather_path` is given and pyarrow is installed, the same
+    rows are also written there as an Arrow file after the CSV, for readers
+    that want memory-mapped columnar access.
+
+    If `generation` is given it must return a number that changes whenever
+    the table does; exports are skipped without querying while it is
+    unchanged since the last one.
+    """
+
+    def __init__(self, csv_path, connection, debounce=EXPORT_DEBOUNCE_SECONDS, generation=None, feather_path=None,
+                 chunk_size=EXPORT_CHUNK_SIZE):
+        self.csv_path = csv_path
+        self.feather_path = feather_path
+        self.connection = connection
+        self.debounce = debounce
+        self.generation = generation
+        self.chunk_size = chunk_size
+        self._exported_generation = None
+        # Serializes exports; writers never wait on it
+        self._lock = threading.Lock()
+        # Guards the debounce timer only, so schedule() returns at once even mid-export
+        self._timer_lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+
+    def schedule(self):
+        """Request an export soon; calls within the debounce window share one export."""
+        with self._timer_lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self.debounce, self._run_scheduled)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Run any pending scheduled export now."""
+        with self._timer_lock:
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+            self.export()
+
+    def export(self):
+        """
+        Rewrite the CSV atomically from the current table
+
+        Returns:
+            bool: False if the campaigns table does not exist yet
+        """
+        with self._lock:
+            # Read before fetching, so a write racing with this export bumps past it
+            generation = self.generation() if self.generation else None
+            if (generation is not None and generation == self._exported_generation
+                    and os.path.exists(self.csv_path) and not self._feather_missing()):
+                return True
+
+            with self.connection() as conn:
+                exists = conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table' AND name='campaigns'"
+                ).fetchone()
+                if not exists:
+                    return False
+                write_campaigns(conn, self.csv_path, self.feather_path, chunk_size=self.chunk_size)
+
+            self._exported_generation = generation
+            return True
+
+    def _run_scheduled(self):
+        with self._timer_lock:
+            self._timer = None
+        try:
+            self.export()
+        except Exception as e:
+            print(f"Error exporting campaigns to CSV: {e}")
+
+    def _feather_missing(self):
+        # Only probe for pyarrow when the file is actually absent
+        return bool(self.feather_path) and not os.path.exists(self.feather_path) and pyarrow_available()
@@ -17,22 +17,33 @@ st.set_page_config(
 st.title("Similar Campaigns Debug Tool")
 st.write("This tool will help diagnose why similar campaigns aren't showing in your app.")
 
-# Step 1: Check imports
-st.header("Step 1: Check Module Imports")
-try:
-    from sentence_transformers import SentenceTransformer, util
-    st.success("✅ Successfully imported sentence_transformers")
-except ImportError as e:
-    st.error(f"❌ Failed to import sentence_transformers: {e}")
-    st.info("Run: pip install sentence-transformers")
-    
-# Step 2: Check if model can be loaded
+# Step 1: Check the shared embedding service
+st.header("Step 1: Check Embedding Service")
+from models.embedding_server import SOCKET_PATH, service_health
+health = service_health(SOCKET_PATH)
+if health:
+    st.success(f"✅ Embedding service is running {health['model']} (pid {health['pid']}, "
+               f"round trip {health['round_trip_ms']:.1f} ms)")
+    st.json(health["latency"])
+else:
+    st.warning(f"⚠️ No embedding service on {SOCKET_PATH} - similarity will load the model in this process")
+    st.info("Run: python -m models.embedding_server")
+
+# Step 2: Check if model can be loaded (only needed without the service)
 st.header("Step 2: Check Model Loading")
-try:
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    st.success("✅ Successfully loaded the model")
-except Exception as e:
-    st.error(f"❌ Failed to load model: {e}")
+if health:
+    st.info("Skipped: the embedding service owns the model")
+else:
+    try:
+        from models.dl_similarity import get_model
+        # Shared with get_similar_campaigns below, so this does not load a second copy
+        get_model()
+        st.success("✅ Successfully loaded the model")
+    except ImportError as e:
+        st.error(f"❌ Failed to import sentence_transformers: {e}")
+        st.info("Run: pip install sentence-transformers")
+    except Exception as e:
+        st.error(f"❌ Failed to load model: {e}")
 
 # Step 3: Check for campaigns.csv
 st.header("Step 3: Check Campaigns Data")
@@ -66,7 +77,7 @@ if st.button("Test Similarity"):
     else:
         # Load the get_similar_campaigns function
         try:
-            from models.dl_similarity import get_similar_campaigns
+            from models.dl_similarity import get_embedding_cache_stats, get_similar_campaigns
             st.success("✅ Successfully imported get_similar_campaigns")
             
             # Test the function with provided inputs
@@ -74,6 +85,7 @@ if st.button("Test Similarity"):
             
             try:
                 similar = get_similar_campaigns(test_title, test_description)
+                st.caption(f"Embedding cache: {get_embedding_cache_stats()}")
                 
                 if similar:
                     st.success(f"✅ Found {len(similar)} similar campaigns!")
@@ -0,0 +1,462 @@
+# Nearest-neighbour indexes for similar-campaign lookup
+
+import math
+import threading
+
+import numpy as np
+
+# Constants
+INDEX_BACKEND = "ivf"
+IVF_MIN_TRAIN_SIZE = 1024
+IVF_NPROBE = 32
+IVF_KMEANS_ITERATIONS = 8
+IVF_SAMPLES_PER_LIST = 64
+QUERY_BATCH_SIZE = 256
+
+# Storage for indexed vectors: "float32", "float16" (2x smaller) or "int8"
+# with a per-vector scale (4x smaller). Quantized matrices are scored in
+# cache-sized chunks of SCORE_CHUNK_ROWS rows, each widened to float32 just
+# for its matrix product, so the float32 copy never exists all at once.
+# numpy widens float16 slowly, so int8 is both the smaller and faster mode.
+QUANTIZATIONS = ("float32", "float16", "int8")
+INDEX_QUANTIZATION = "int8"
+SCORE_CHUNK_ROWS = 1024
+
+# Exact re-ranking of a quantized index fetches this many times top_k
+# candidates scoring within the margin of the threshold, then re-scores
+# them against the float32 vectors (rerank_exact)
+RERANK_CANDIDATES = 4
+QUANTIZED_SCORE_MARGIN = 0.02
+
+
+def _top_k(ids, scores, top_k, threshold):
+    """Keep the top_k scores above threshold, highest first."""
+    mask = scores > threshold
+    ids, scores = ids[mask], scores[mask]
+    if len(scores) > top_k:
+        keep = np.argpartition(-scores, top_k - 1)[:top_k]
+        ids, scores = ids[keep], scores[keep]
+    order = np.argsort(-scores, kind="stable")
+    return ids[order], scores[order]
+
+
+def _top_k_rows(ids, scores, top_k, threshold):
+    """Row-wise _top_k over a (queries x candidates) score matrix."""
+    k = min(top_k, scores.shape[1])
+    if k == 0:
+        return [(ids[:0], scores[i, :0]) for i in range(len(scores))]
+
+    cols = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top = np.take_along_axis(scores, cols, axis=1)
+    order = np.argsort(-top, axis=1, kind="stable")
+    cols = np.take_along_axis(cols, order, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    keep = top > threshold
+    return [(ids[c[m]], s[m]) for c, s, m in zip(cols, top, keep)]
+
+
+def _quantize(vectors, quantization):
+    """Return (stored matrix, per-vector scales or None) for float32 vectors."""
+    if quantization == "float32":
+        return vectors, None
+    if quantization == "float16":
+        return vectors.astype(np.float16), None
+    if quantization == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127
+        scales[scales == 0] = 1.0
+        return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    raise ValueError(f"Unknown quantization: {quantization}")
+
+
+def rerank_exact(queries, candidates, vectors_for, top_k=3, threshold=0.3):
+    """
+    Re-score candidate hits with exact float32 vectors.
+
+    Args:
+        queries (np.ndarray): (queries x dim) normalized query matrix
+        candidates (list): (ids, approximate scores) per query, e.g. from a quantized index
+        vectors_for (callable): Maps an array of ids to their float32 vectors
+        top_k (int): Hits to keep per query
+        threshold (float): Minimum exact score
+
+    Returns:
+        list: (ids, scores) per query, best first
+    """
+    counts = [len(ids) for ids, _ in candidates]
+    if not sum(counts):
+        return [(ids, scores) for ids, scores in candidates]
+    all_ids = np.concatenate([ids for ids, _ in candidates])
+    vectors = np.asarray(vectors_for(all_ids), dtype=np.float32)
+
+    results = []
+    offset = 0
+    for query, count in zip(np.atleast_2d(queries), counts):
+        ids = all_ids[offset:offset + count]
+        results.append(_top_k(ids, vectors[offset:offset + count] @ query, top_k, threshold))
+        offset += count
+    return results
+
+
+class _FlatList:
+    """Growable id/vector arrays with O(1) swap-remove, optionally quantized."""
+
+    def __init__(self, dim, quantization="float32"):
+        self.dim = dim
+        self.quantization = quantization
+        self.size = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = _quantize(np.empty((0, dim), dtype=np.float32), quantization)[0]
+        self.scales = np.empty(0, dtype=np.float32) if quantization == "int8" else None
+        self.positions = {}
+
+    def add(self, ids, vectors):
+        stored, scales = _quantize(vectors, self.quantization)
+        needed = self.size + len(ids)
+        if needed > len(self.ids):
+            capacity = max(needed, 2 * len(self.ids), 16)
+            grown_ids = np.empty(capacity, dtype=np.int64)
+            grown_vectors = np.empty((capacity, self.dim), dtype=self.vectors.dtype)
+            grown_ids[:self.size] = self.ids[:self.size]
+            grown_vectors[:self.size] = self.vectors[:self.size]
+            self.ids, self.vectors = grown_ids, grown_vectors
+            if self.scales is not None:
+                grown_scales = np.empty(capacity, dtype=np.float32)
+                grown_scales[:self.size] = self.scales[:self.size]
+                self.scales = grown_scales
+
+        self.ids[self.size:needed] = ids
+        self.vectors[self.size:needed] = stored
+        if self.scales is not None:
+            self.scales[self.size:needed] = scales
+        for offset, campaign_id in enumerate(ids):
+            self.positions[int(campaign_id)] = self.size + offset
+        self.size = needed
+
+    def remove(self, campaign_id):
+        row = self.positions.pop(int(campaign_id))
+        last = self.size - 1
+        if row != last:
+            moved_id = int(self.ids[last])
+            self.ids[row] = moved_id
+            self.vectors[row] = self.vectors[last]
+            if self.scales is not None:
+                self.scales[row] = self.scales[last]
+            self.positions[moved_id] = row
+        self.size = last
+
+    def decoded(self):
+        """Return the held vectors as float32 (approximate when quantized)."""
+        vectors = self.vectors[:self.size].astype(np.float32)
+        if self.scales is not None:
+            vectors *= self.scales[:self.size, None]
+        return vectors
+
+    def scores(self, queries):
+        """Score a (queries x dim) matrix against every held vector."""
+        vectors = self.vectors[:self.size]
+        if self.quantization == "float32":
+            return queries @ vectors.T
+
+        out = np.empty((len(queries), self.size), dtype=np.float32)
+        for start in range(0, self.size, SCORE_CHUNK_ROWS):
+            end = min(start + SCORE_CHUNK_ROWS, self.size)
+            out[:, start:end] = queries @ vectors[start:end].astype(np.float32).T
+        if self.scales is not None:
+            out *= self.scales[:self.size]
+        return out
+
+    def search(self, query):
+        return self.ids[:self.size], self.scores(query[None, :])[0]
+
+    def nbytes(self):
+        """Bytes held for vectors (and scales), including spare capacity."""
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+
+class VectorIndex:
+    """
+    Interface for indexes over normalized embeddings keyed by campaign id.
+
+    Scores are cosine similarities, so vectors and queries must be
+    L2-normalized before they are added or searched.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __contains__(self, campaign_id):
+        raise NotImplementedError
+
+    def ids(self):
+        """Return the ids currently held by the index."""
+        raise NotImplementedError
+
+    def add(self, ids, vectors):
+        """Insert vectors, replacing any that are already indexed under the same id."""
+        raise NotImplementedError
+
+    def remove(self, ids):
+        """Delete vectors by id; unknown ids are ignored."""
+        raise NotImplementedError
+
+    def search(self, query, top_k=3, threshold=0.3):
+        """
+        Find the most similar indexed vectors.
+
+        Returns:
+            tuple: (ids, scores) arrays of at most top_k hits above threshold, best first
+        """
+        raise NotImplementedError
+
+    def search_batch(self, queries, top_k=3, threshold=0.3):
+        """Run `search` for every row of a (queries x dim) matrix, returning a list of (ids, scores)."""
+        return [self.search(query, top_k, threshold) for query in queries]
+
+    def memory_usage(self):
+        """Return the bytes held for indexed vectors."""
+        raise NotImplementedError
+
+
+class BruteForceIndex(VectorIndex):
+    """Exact index that scores every vector."""
+
+    def __init__(self, quantization=INDEX_QUANTIZATION):
+        super().__init__()
+        self.quantization = quantization
+        self._list = None
+
+    def __len__(self):
+        return self._list.size if self._list else 0
+
+    def __contains__(self, campaign_id):
+        return self._list is not None and int(campaign_id) in self._list.positions
+
+    def ids(self):
+        if self._list is None:
+            return np.empty(0, dtype=np.int64)
+        return self._list.ids[:self._list.size].copy()
+
+    def add(self, ids, vectors):
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self._list is None:
+                self._list = _FlatList(vectors.shape[1], self.quantization)
+            self.remove(ids)
+            self._list.add(ids, vectors)
+
+    def remove(self, ids):
+        with self._lock:
+            if self._list is None:
+                return
+            for campaign_id in ids:
+                if int(campaign_id) in self._list.positions:
+                    self._list.remove(campaign_id)
+
+    def search(self, query, top_k=3, threshold=0.3):
+        with self._lock:
+            if not len(self):
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            ids, scores = self._list.search(np.asarray(query, dtype=np.float32))
+            return _top_k(ids, scores, top_k, threshold)
+
+    def search_batch(self, queries, top_k=3, threshold=0.3):
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        with self._lock:
+            if not len(self):
+                return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in queries]
+
+            ids = self._list.ids[:self._list.size]
+            results = []
+            # Chunk queries so the score matrix stays bounded for large corpora
+            for start in range(0, len(queries), QUERY_BATCH_SIZE):
+                scores = self._list.scores(queries[start:start + QUERY_BATCH_SIZE])
+                results.extend(_top_k_rows(ids, scores, top_k, threshold))
+            return results
+
+    def memory_usage(self):
+        with self._lock:
+            return self._list.nbytes() if self._list is not None else 0
+
+
+class IVFFlatIndex(VectorIndex):
+    """
+    Inverted-file index with exact scoring inside the probed lists.
+
+    Vectors are partitioned around spherical k-means centroids and a query
+    only scores the `nprobe` lists whose centroids are closest to it. The
+    index stays exact (a single list) until it holds `min_train_size`
+    vectors, and re-clusters itself whenever it has grown or shrunk by 4x
+    since the last training so list sizes stay near sqrt(N).
+    """
+
+    def __init__(self, nprobe=IVF_NPROBE, min_train_size=IVF_MIN_TRAIN_SIZE, seed=0, quantization=INDEX_QUANTIZATION):
+        super().__init__()
+        self.quantization = quantization
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self._rng = np.random.default_rng(seed)
+        self._dim = None
+        self._centroids = None
+        self._lists = []
+        self._list_of = {}
+        self._trained_size = 0
+
+    def __len__(self):
+        return len(self._list_of)
+
+    def __contains__(self, campaign_id):
+        return int(campaign_id) in self._list_of
+
+    def ids(self):
+        return np.fromiter(self._list_of.keys(), dtype=np.int64, count=len(self._list_of))
+
+    def add(self, ids, vectors):
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                self._lists = [_FlatList(self._dim, self.quantization)]
+            self._discard(ids)
+            size = len(self) + len(ids)
+            if self._centroids is None and size >= self.min_train_size:
+                # Cluster a bulk load directly rather than filing it in the single list first
+                self._rebuild(size, ids, vectors)
+                return
+            self._insert(ids, vectors)
+            self._maybe_retrain()
+
+    def remove(self, ids):
+        with self._lock:
+            if self._discard(ids):
+                self._maybe_retrain()
+
+    def search(self, query, top_k=3, threshold=0.3):
+        return self.search_batch(np.asarray(query, dtype=np.float32)[None, :], top_k, threshold)[0]
+
+    def search_batch(self, queries, top_k=3, threshold=0.3):
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        with self._lock:
+            if not len(self):
+                return [empty for _ in queries]
+
+            if self._centroids is None:
+                flat = self._lists[0]
+                return _top_k_rows(flat.ids[:flat.size], flat.scores(queries), top_k, threshold)
+
+            # Pick every query's probe lists with one centroid matrix product
+            nprobe = min(self.nprobe, len(self._lists))
+            nearest = np.argpartition(-(queries @ self._centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+
+            results = []
+            for query, probe in zip(queries, nearest):
+                hits = [self._lists[list_no].search(query) for list_no in probe if self._lists[list_no].size]
+                if not hits:
+                    results.append(empty)
+                    continue
+                ids = np.concatenate([h[0] for h in hits])
+                scores = np.concatenate([h[1] for h in hits])
+                results.append(_top_k(ids, scores, top_k, threshold))
+            return results
+
+    def memory_usage(self):
+        with self._lock:
+            centroids = self._centroids.nbytes if self._centroids is not None else 0
+            return centroids + sum(flat.nbytes() for flat in self._lists)
+
+    def _discard(self, ids):
+        removed = 0
+        for campaign_id in ids:
+            list_no = self._list_of.pop(int(campaign_id), None)
+            if list_no is not None:
+                self._lists[list_no].remove(campaign_id)
+                removed += 1
+        return removed
+
+    def _insert(self, ids, vectors):
+        if self._centroids is None:
+            assignments = np.zeros(len(ids), dtype=np.int64)
+        else:
+            assignments = np.argmax(vectors @ self._centroids.T, axis=1)
+
+        for list_no in np.unique(assignments):
+            members = np.flatnonzero(assignments == list_no)
+            self._lists[list_no].add(ids[members], vectors[members])
+        for campaign_id, list_no in zip(ids, assignments):
+            self._list_of[int(campaign_id)] = int(list_no)
+
+    def _maybe_retrain(self):
+        size = len(self)
+        if size < self.min_train_size:
+            if self._centroids is not None:
+                self._rebuild(None)
+            return
+        if self._centroids is None or size > 4 * self._trained_size or 4 * size < self._trained_size:
+            self._rebuild(size)
+
+    def _rebuild(self, size, new_ids=None, new_vectors=None):
+        ids = [flat.ids[:flat.size] for flat in self._lists]
+        # Quantized vectors round-trip unchanged through decode and re-quantize
+        vectors = [flat.decoded() for flat in self._lists]
+        if new_ids is not None:
+            ids.append(new_ids)
+            vectors.append(new_vectors)
+        ids = np.concatenate(ids)
+        vectors = np.concatenate(vectors)
+
+        if size is None:
+            self._centroids = None
+            self._trained_size = 0
+            self._lists = [_FlatList(self._dim, self.quantization)]
+        else:
+            nlist = max(1, int(math.sqrt(size)))
+            self._centroids = self._kmeans(vectors, nlist)
+            self._trained_size = size
+            self._lists = [_FlatList(self._dim, self.quantization) for _ in range(nlist)]
+
+        self._list_of = {}
+        self._insert(ids, vectors)
+
+    def _kmeans(self, vectors, nlist):
+        """Spherical k-means on a sample of the vectors."""
+        sample_size = min(len(vectors), nlist * IVF_SAMPLES_PER_LIST)
+        sample = vectors[self._rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[self._rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(IVF_KMEANS_ITERATIONS):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable")
+            counts = np.bincount(assignments, minlength=nlist)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+            filled = counts > 0
+            sums = np.add.reduceat(sample[order], starts[filled], axis=0)
+            centroids[filled] = sums
+            # Re-seed empty lists from random sample points
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sample[self._rng.choice(sample_size, len(empty), replace=False)]
+
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids /= norms
+
+        return centroids
+
+
+def create_index(backend=INDEX_BACKEND, **kwargs):
+    """Create an empty index for the given backend ('ivf' or 'brute'); `quantization` is passed to either."""
+    if backend == "ivf":
+        return IVFFlatIndex(**kwargs)
+    if backend == "brute":
+        return BruteForceIndex(**kwargs)
+    raise ValueError(f"Unknown index backend: {backend}")
@@ -1,10 +1,13 @@
 from db.database import (
     add_campaign as db_add_campaign,
     get_all_campaigns as db_get_all_campaigns,
+    get_campaigns_page as db_get_campaigns_page,
+    get_dashboard_stats as db_get_dashboard_stats,
+    search_campaigns as db_search_campaigns,
     get_campaign_by_id as db_get_campaign_by_id,
-    update_campaign_status as db_update_campaign_status,
-    donate_to_campaign as db_donate_to_campaign
+    update_campaign_status as db_update_campaign_status
 )
+from db.donation_queue import donate as queue_donate
 
 class Campaign:
     """
@@ -39,6 +42,50 @@ class Campaign:
         """
         return db_get_all_campaigns()
     
+    @staticmethod
+    def get_campaigns_page(cursor=None, limit=20, sort='newest', status=None, search=None):
+        """
+        Get one page of campaigns
+        
+        Args:
+            cursor (tuple): Cursor returned with the previous page, or None for the first page
+            limit (int): Maximum number of campaigns to return
+            sort (str): 'newest', 'highest_funded' or 'closest_to_goal'
+            status (str): Optional status to filter by
+            search (str): Optional full-text query; see search_campaigns
+            
+        Returns:
+            tuple: (list of campaigns, cursor for the next page or None)
+        """
+        return db_get_campaigns_page(cursor, limit, sort, status, search)
+    
+    @staticmethod
+    def search_campaigns(query, status=None, sort='relevance', limit=20, cursor=None):
+        """
+        Full-text search over campaign titles, descriptions and owners
+        
+        Args:
+            query (str): Search text; the last word matches as a prefix
+            status (str): Optional status to filter by
+            sort (str): 'relevance', 'newest', 'highest_funded' or 'closest_to_goal'
+            limit (int): Maximum number of campaigns to return
+            cursor (tuple): Cursor returned with the previous page, or None for the first page
+            
+        Returns:
+            tuple: (list of campaigns, cursor for the next page or None)
+        """
+        return db_search_campaigns(query, status, sort, limit, cursor)
+    
+    @staticmethod
+    def get_dashboard_stats():
+        """
+        Get campaign counts and fundraising totals for the dashboard
+        
+        Returns:
+            dict: total_campaigns, total_raised, total_target and per-status totals
+        """
+        return db_get_dashboard_stats()
+    
     @staticmethod
     def get_campaign(campaign_id):
         """
@@ -78,4 +125,5 @@ class Campaign:
         Returns:
             bool: True if successful
         """
-        return db_donate_to_campaign(campaign_id, amount)
\ No newline at end of file
+        # Donations from concurrent sessions share one commit
+        return queue_donate(campaign_id, amount)
\ No newline at end of file
@@ -1,26 +1,328 @@
 # Deep Learning-based Similar Campaign Recommender for OpenFunds
 
-from sentence_transformers import SentenceTransformer, util
-import pandas as pd
-import os
-import torch
+import numpy as np
 import logging
+import os
+import threading
+import time
+
+from db import embeddings
+from db.database import get_data_generation
+from models.ann_index import (
+    INDEX_BACKEND,
+    INDEX_QUANTIZATION,
+    QUANTIZED_SCORE_MARGIN,
+    RERANK_CANDIDATES,
+    create_index,
+    rerank_exact,
+)
+from models.embedding_cache import EmbeddingCache
+from models.embedding_server import SOCKET_PATH, EmbeddingClient, EmbeddingServiceError
+from models.embedding_store import MODEL_NAME, campaign_text, content_hash, normalize
+from models.encode_batcher import EncodeBatcher
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Constants
-CSV_PATH = "data_exports/campaigns.csv"
-MODEL_NAME = 'all-MiniLM-L6-v2'
+# Changed campaigns are encoded and saved this many at a time
+EMBED_CHUNK_SIZE = 1024
+
+# With a quantized index, re-score candidates exactly against the float32
+# store (see RERANK_CANDIDATES in models.ann_index); set EXACT_RERANK = False
+# to use the approximate scores
+EXACT_RERANK = True
+
+# A query encodes at most this many new or edited campaigns itself; beyond
+# that they are left to the embedding job (JOB_EMBED) and indexed once it
+# has stored their vectors, which is checked for at most this often
+INLINE_ENCODE_LIMIT = 16
+PENDING_RECHECK_INTERVAL = 5.0
+
+# After the embedding service fails, encode in-process for this long before trying it again
+SERVICE_RETRY_INTERVAL = 30.0
+
+# Model is loaded on first use so importing this module does not pull in torch
+model = None
+_model_lock = threading.Lock()
+
+# Text -> embedding cache in front of query encodes (corpus syncs bypass it)
+_embedding_cache = EmbeddingCache(MODEL_NAME)
+
+# Client for the shared embedding service (models.embedding_server)
+_client = EmbeddingClient(SOCKET_PATH)
+_service_retry_at = 0.0
+
+# Nearest-neighbour index over campaigns that are still open
+_index = None
+
+# What the index reflects: the data generation, the newest campaigns.updated_at
+# and campaign_embeddings.embedded_at read into it, and the open campaigns it
+# has no current vector for yet
+_index_generation = None
+_index_watermark = None
+_embedded_watermark = None
+_pending = set()
+_pending_checked = 0.0
+_sync_lock = threading.Lock()
+
+# Serializes this process's passes over campaign_embeddings
+_store_lock = threading.Lock()
+
+
+def get_model():
+    """Return the shared SentenceTransformer, importing and loading it on first call."""
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(MODEL_NAME)
+                logger.info(f"Model {MODEL_NAME} loaded successfully")
+    return model
+
+
+_batcher = EncodeBatcher(lambda texts: get_model().encode(texts, convert_to_numpy=True))
+
+
+def encode_in_process(texts):
+    """Encode texts with this process's model, batched with concurrent callers."""
+    return _batcher.encode(texts)
+
+
+def warmup():
+    """Load the model and index ahead of the first query."""
+    if not _ensure_model():
+        return False
+    _sync_index()
+    return True
+
+
+def _service_available():
+    """Whether the embedding service is worth trying: its socket exists and it has not just failed."""
+    return time.monotonic() >= _service_retry_at and os.path.exists(_client.socket_path)
+
+
+def _encode_remote(texts):
+    """Encode through the embedding service, or return None if it cannot be used."""
+    global _service_retry_at
+    if not _service_available():
+        return None
+    try:
+        return _client.encode(texts, MODEL_NAME)
+    except (ConnectionError, EmbeddingServiceError) as e:
+        logger.warning(f"{e} - encoding in-process for the next {SERVICE_RETRY_INTERVAL:.0f}s")
+        _service_retry_at = time.monotonic() + SERVICE_RETRY_INTERVAL
+        return None
+
+
+def _encode_uncached(texts):
+    embeddings = _encode_remote(texts)
+    if embeddings is None:
+        embeddings = encode_in_process(texts)
+    return normalize(embeddings)
+
+
+def _encode(texts):
+    """Encode a list of texts into normalized float32 embeddings, preferring the cache, then the shared service."""
+    return _embedding_cache.encode(texts, _encode_uncached)
+
+
+def get_embedding_cache_stats():
+    """Return hit/miss counters of the text -> embedding cache."""
+    return _embedding_cache.stats()
+
+
+def _split_changed(rows):
+    """
+    Compare changed campaigns' text with their stored hash
+
+    Returns:
+        tuple: (rows whose stored vector is current,
+        (campaign_id, content_hash, text, updated_at) tuples for the rest)
+    """
+    current, stale = [], []
+    for row in rows:
+        text = campaign_text(row['title'], row['description'])
+        digest = content_hash(text)
+        if row['content_hash'] == digest:
+            current.append(row)
+        else:
+            stale.append((row['id'], digest, text, row['updated_at']))
+    return current, stale
+
+
+def _encode_and_save(stale):
+    """Encode and store (campaign_id, content_hash, text, updated_at) tuples, returning the vectors."""
+    # Not through the query cache: campaign_embeddings already stores these,
+    # and a large resync would evict every cached draft
+    encoded = _encode_uncached([text for _, _, text, _ in stale])
+    embeddings.save_embeddings(MODEL_NAME, [
+        (campaign_id, digest, vector, updated_at)
+        for (campaign_id, digest, _, updated_at), vector in zip(stale, encoded)
+    ])
+    return encoded
+
+
+def _sync_store():
+    """Encode campaigns whose stored embedding is missing or stale, and mark the rest as checked."""
+    with _store_lock:
+        rows = embeddings.get_changed_campaigns(MODEL_NAME)
+        current, stale = _split_changed(rows)
+        if current:
+            embeddings.mark_checked([(row['id'], row['updated_at']) for row in current])
+
+        # Saved chunk by chunk so a long first run keeps its progress if interrupted
+        for start in range(0, len(stale), EMBED_CHUNK_SIZE):
+            _encode_and_save(stale[start:start + EMBED_CHUNK_SIZE])
+
+        if stale:
+            logger.info(f"Re-encoded {len(stale)} of {len(rows)} changed campaigns")
+
+
+def _is_open(row):
+    return str(row['status']).lower() != 'closed'
+
+
+def _queue_embedding_job():
+    """Have the background worker encode the campaigns the index is waiting for."""
+    from utils.job_queue import JOB_EMBED, enqueue_job, start_worker_if_idle
+    try:
+        enqueue_job(JOB_EMBED)
+        start_worker_if_idle()
+    except Exception as e:
+        logger.warning(f"Could not queue the embedding job: {e}")
+
+
+def _apply_changes(index, rows):
+    """
+    Update the index from changed campaigns
+
+    Closed campaigns are dropped and open ones take their stored vector.
+    A handful whose vector is missing or stale are encoded here; more are
+    left pending, keeping any vector they had, and the embedding job is
+    queued for them.
+    """
+    closed = [row['id'] for row in rows if not _is_open(row)]
+    index.remove(closed)
+    _pending.difference_update(closed)
+
+    current, stale = _split_changed([row for row in rows if _is_open(row)])
+    if current:
+        ids = [row['id'] for row in current]
+        index.add(ids, np.stack([embeddings.blob_to_vector(row['vector']) for row in current]))
+        _pending.difference_update(ids)
+
+    if len(stale) > INLINE_ENCODE_LIMIT:
+        parked = {campaign_id for campaign_id, _, _, _ in stale} - _pending
+        _pending.update(parked)
+        if parked:
+            logger.info(f"{len(stale)} campaigns will be searchable once the embedding job has encoded them")
+            _queue_embedding_job()
+    elif stale:
+        ids = [campaign_id for campaign_id, _, _, _ in stale]
+        index.add(ids, _encode_and_save(stale))
+        _pending.difference_update(ids)
+
+
+def _sync_index():
+    """
+    Bring the index in line with the campaigns table and the stored embeddings
+
+    Nothing is read while the data generation is unchanged and no campaign is
+    waiting for its vector. After the build only campaigns updated, and
+    embeddings stored, since the last sync are fetched, so a new or edited
+    campaign is searchable by the next query. Timestamps are taken inside
+    write transactions, so they follow commit order and nothing can commit
+    behind a watermark.
+    """
+    global _index, _index_generation, _index_watermark, _embedded_watermark, _pending_checked
+    with _sync_lock:
+        # Read before fetching, so a write racing with this sync bumps past it
+        generation = get_data_generation()
+        now = time.monotonic()
+        recheck = _pending and now - _pending_checked >= PENDING_RECHECK_INTERVAL
+        if _index is not None and generation == _index_generation and not recheck:
+            return
+
+        latest = embeddings.get_latest_update()
+        embedded = embeddings.get_latest_embedding(MODEL_NAME)
+        if _index is None:
+            # One add, so the index clusters once instead of at every 4x of growth
+            chunks = list(embeddings.iter_open_embeddings(MODEL_NAME))
+            index = create_index(INDEX_BACKEND, quantization=INDEX_QUANTIZATION)
+            if chunks:
+                index.add(np.concatenate([ids for ids, _ in chunks]), np.concatenate([v for _, v in chunks]))
+            _pending.clear()
+            rows = embeddings.get_changed_campaigns(MODEL_NAME)
+        else:
+            index = _index
+            rows = {row['id']: row for row in embeddings.get_embedded_campaigns(MODEL_NAME, _embedded_watermark)}
+            if generation != _index_generation:
+                rows.update((row['id'], row) for row in embeddings.get_changed_campaigns(MODEL_NAME, _index_watermark))
+            rows = list(rows.values())
+        _apply_changes(index, rows)
+
+        _index = index
+        _index_watermark = latest or _index_watermark
+        _embedded_watermark = embedded or _embedded_watermark
+        _index_generation = generation
+        _pending_checked = now
+
+
+def _ensure_model():
+    """Make sure texts can be encoded, loading the model in-process only when the service is absent."""
+    if _service_available():
+        return True
+    try:
+        get_model()
+    except Exception as e:
+        logger.error(f"Failed to load model on-demand: {e}")
+        return False
+    return True
+
+
+def _query_text(query):
+    """Accept either a (title, description) pair or a ready-made text."""
+    if isinstance(query, str):
+        return query
+    title, description = query
+    return campaign_text(title, description)
+
+
+def _stored_vectors(ids, dim):
+    """Exact float32 vectors for ids, zeros for any deleted since they were indexed."""
+    found = embeddings.get_embeddings(ids, MODEL_NAME)
+    missing = np.zeros(dim, dtype=np.float32)
+    return np.stack([found.get(int(campaign_id), missing) for campaign_id in ids])
+
+
+def _search(query_embeddings, top_k, threshold):
+    """Query the index, re-ranking quantized candidates with exact float32 scores."""
+    if not EXACT_RERANK or _index.quantization == "float32":
+        return _index.search_batch(query_embeddings, top_k, threshold)
+    candidates = _index.search_batch(
+        query_embeddings, top_k * RERANK_CANDIDATES, threshold - QUANTIZED_SCORE_MARGIN
+    )
+    dim = query_embeddings.shape[1]
+    return rerank_exact(query_embeddings, candidates, lambda ids: _stored_vectors(ids, dim), top_k, threshold)
+
+
+def _assemble_results(hits):
+    """Fetch title/description for every hit in one query."""
+    if not sum(len(hit_ids) for hit_ids, _ in hits):
+        return [[] for _ in hits]
+
+    texts = embeddings.get_campaign_texts(np.concatenate([hit_ids for hit_ids, _ in hits]))
+    return [
+        [
+            {'title': texts[campaign_id][0], 'description': texts[campaign_id][1], 'score': float(score)}
+            for campaign_id, score in zip(hit_ids.tolist(), hit_scores.tolist())
+            if campaign_id in texts
+        ]
+        for hit_ids, hit_scores in hits
+    ]
 
-# Initialize model globally to avoid reloading
-try:
-    model = SentenceTransformer(MODEL_NAME)
-    logger.info(f"Model {MODEL_NAME} loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading model: {e}")
-    model = None
 
 # Get Similar Campaigns Based on Text Similarity
 def get_similar_campaigns(title, description, top_k=3, threshold=0.3):
@@ -28,113 +330,87 @@ def get_similar_campaigns(title, description, top_k=3, threshold=0.3):
     Find similar campaigns based on title and description.
     Returns list of dicts with title, description, and similarity score.
     """
+    return get_similar_campaigns_batch([(title, description)], top_k, threshold)[0]
+
+
+def get_similar_campaigns_batch(queries, top_k=3, threshold=0.3):
+    """
+    Find similar campaigns for many queries at once.
+
+    Args:
+        queries (list): (title, description) pairs or plain query texts
+        top_k (int): Maximum number of matches per query
+        threshold (float): Minimum cosine similarity for a match
+
+    Returns:
+        list: One list of {title, description, score} dicts per query
+    """
+    queries = list(queries)
+    no_results = [[] for _ in queries]
+
     # Ensure model is loaded
-    global model
-    if model is None:
-        try:
-            model = SentenceTransformer(MODEL_NAME)
-            logger.info("Model loaded on-demand")
-        except Exception as e:
-            logger.error(f"Failed to load model on-demand: {e}")
-            return []
-
-    # Check for CSV file
-    if not os.path.exists(CSV_PATH):
-        logger.warning(f"CSV file not found at {CSV_PATH}")
-        return []
+    if not queries or not _ensure_model():
+        return no_results
 
     try:
-        # Read campaigns
-        df = pd.read_csv(CSV_PATH)
-        
-        # Return empty if no campaigns
-        if df.empty:
-            logger.info("CSV file exists but is empty")
-            return []
-            
-        # Log number of campaigns found
-        logger.info(f"Found {len(df)} campaigns in CSV")
-
-        # Prepare inputs
-        df['text'] = df['title'].astype(str) + " " + df['description'].astype(str)
-        input_text = title + " " + description
-
-        # Encode existing campaigns
-        logger.info("Encoding campaign texts...")
-        corpus_embeddings = model.encode(df['text'].tolist(), convert_to_tensor=True)
-        
-        # Encode input
-        input_embedding = model.encode(input_text, convert_to_tensor=True)
+        # Pick up campaigns added or edited since the last query
+        _sync_index()
+        if not len(_index):
+            logger.info("No open campaigns to compare against")
+            return no_results
 
-        # Compute similarity
-        logger.info("Computing similarity...")
-        cos_scores = util.pytorch_cos_sim(input_embedding, corpus_embeddings)[0]
-        
-        # Convert to regular Python list
-        scores = cos_scores.cpu().tolist()
-
-        # Build response with indices and scores
-        results = []
-        for idx, score in enumerate(scores):
-            # Only include sufficiently similar campaigns
-            if score > threshold:
-                row = df.iloc[idx]
-                results.append({
-                    'title': row['title'],
-                    'description': row['description'],
-                    'score': score
-                })
-        
-        # Sort by similarity score (highest first) and take top_k
-        results = sorted(results, key=lambda x: x['score'], reverse=True)[:top_k]
+        # Log number of campaigns indexed
+        logger.info(f"Found {len(_index)} open campaigns")
+
+        # Encode all queries in one call
+        query_embeddings = _encode([_query_text(query) for query in queries])
+
+        # Index returns the top_k hits above threshold per query, best first
+        logger.info(f"Computing similarity for {len(queries)} queries...")
+        hits = _search(query_embeddings, top_k, threshold)
+        results = _assemble_results(hits)
         
-        logger.info(f"Found {len(results)} similar campaigns")
+        logger.info(f"Found {sum(len(r) for r in results)} similar campaigns")
         return results
 
     except Exception as e:
         logger.error(f"Error in get_similar_campaigns: {e}")
         import traceback
         logger.error(traceback.format_exc())
-        return []
+        return no_results
 
-# Update Embeddings (not needed during prediction, only if extending feature)
+# Update Embeddings
 def update_embeddings():
-    """Update embeddings for all campaigns in the CSV."""
-    if not os.path.exists(CSV_PATH):
-        logger.warning(f"CSV file not found at {CSV_PATH} - cannot update embeddings")
-        return
+    """
+    Incrementally update the stored embeddings for all campaigns
 
-    try:
-        # Ensure model is loaded
-        global model
-        if model is None:
-            model = SentenceTransformer(MODEL_NAME)
-            
-        df = pd.read_csv(CSV_PATH)
-        if df.empty:
-            logger.info("No campaigns to update embeddings for")
-            return
-            
-        texts = (df['title'].astype(str) + " " + df['description'].astype(str)).tolist()
-        logger.info(f"Updating embeddings for {len(texts)} campaigns")
-        
-        # Generate embeddings
-        embeddings = model.encode(texts, convert_to_tensor=True)
-        
-        logger.info("Embeddings updated successfully")
-        return embeddings
+    Returns:
+        bool: True once campaign_embeddings is current
 
-    except Exception as e:
-        logger.error(f"Error updating embeddings: {e}")
-        return None
+    Raises:
+        Exception: if the model cannot be loaded or encoding fails, so the
+        embedding job is recorded as failed with the cause
+    """
+    # Load the model here rather than through _ensure_model, which only logs its error
+    if not _service_available():
+        get_model()
+
+    # Only new or edited campaigns are encoded
+    _sync_store()
+
+    logger.info("Embeddings updated successfully")
+    return True
 
 # If run as script, test the model loading
 if __name__ == "__main__":
     print(f"Testing model loading: {MODEL_NAME}")
-    model = SentenceTransformer(MODEL_NAME)
-    print("Model loaded successfully!")
+    if _service_available():
+        print(f"Using embedding service on {_client.socket_path}")
+    else:
+        get_model()
+        print("Model loaded successfully!")
     
     # Test encoding
-    test_embedding = model.encode("Test campaign", convert_to_tensor=True)
+    test_embedding = _encode(["Test campaign"])[0]
     print(f"Test encoding shape: {test_embedding.shape}")
     print("All tests passed!")
\ No newline at end of file
@@ -0,0 +1,201 @@
+# Text -> embedding cache for the similarity recommender
+#
+# Streamlit reruns a page on every interaction, so the same draft title and
+# description reach the encoder again and again. Entries are keyed on a hash
+# of the model name and the whitespace-normalized text, kept in a bounded
+# in-memory LRU and, if a path is configured, in a SQLite file shared by
+# every process on the host.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+# Constants
+EMBEDDING_CACHE_SIZE = 4096
+# SQLite file for the shared disk layer; unset keeps the cache in memory only
+EMBEDDING_CACHE_PATH = os.environ.get("OPENFUNDS_EMBEDDING_CACHE")
+DISK_CACHE_MAX_ENTRIES = 50000
+DISK_PRUNE_EVERY = 1000
+
+
+def normalize_text(text):
+    """Canonical form used for cache keys: NFC, with runs of whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model_name, text):
+    """Cache key for a text embedded by a given model."""
+    return hashlib.sha1(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class _DiskLayer:
+    """SQLite table of key -> float32 vector bytes, pruned oldest-first."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            key TEXT PRIMARY KEY,
+            vector BLOB NOT NULL,
+            stored_at REAL NOT NULL
+        )
+        ''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_stored ON embedding_cache (stored_at)")
+        self._inserts = 0
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embedding_cache WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            for key, vector in rows:
+                found[key] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embedding_cache (key, vector, stored_at) VALUES (?, ?, ?)",
+            [(key, np.ascontiguousarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items],
+        )
+        self._inserts += len(items)
+        if self._inserts >= DISK_PRUNE_EVERY:
+            self._inserts = 0
+            self._conn.execute(
+                "DELETE FROM embedding_cache WHERE key IN ("
+                "SELECT key FROM embedding_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (DISK_CACHE_MAX_ENTRIES,),
+            )
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU of text -> normalized embedding, optionally backed by SQLite.
+
+    encode() looks every text up, encodes only the misses (each distinct
+    text once) and stores the results, so an unchanged draft never reaches
+    the model twice. Disk failures are counted and otherwise ignored; the
+    cache then behaves as memory only.
+    """
+
+    def __init__(self, model_name, max_entries=EMBEDDING_CACHE_SIZE, disk_path=EMBEDDING_CACHE_PATH):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk = None
+        self._disk_path = disk_path
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_errors": 0}
+
+    def _disk_layer(self):
+        if self._disk is None and self._disk_path:
+            try:
+                self._disk = _DiskLayer(self._disk_path)
+            except sqlite3.Error:
+                self._stats["disk_errors"] += 1
+                self._disk_path = None
+        return self._disk
+
+    def _remember(self, key, vector):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def encode(self, texts, encode):
+        """
+        Return embeddings for texts, calling `encode` only for texts not cached
+
+        Args:
+            texts (list): Texts to embed
+            encode (callable): Maps a list of texts to normalized embeddings
+
+        Returns:
+            np.ndarray: float32 array with one row per text
+        """
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        keys = [cache_key(self.model_name, text) for text in texts]
+        key_texts = dict(zip(keys, texts))
+
+        vectors = {}
+        with self._lock:
+            for key in key_texts:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    vectors[key] = vector
+        missing = [key for key in key_texts if key not in vectors]
+        hits = sum(1 for key in keys if key in vectors)
+
+        disk_found = {}
+        if missing:
+            disk_found = self._disk_get(missing)
+            vectors.update(disk_found)
+            missing = [key for key in missing if key not in disk_found]
+
+        new = {}
+        if missing:
+            encoded = np.asarray(encode([key_texts[key] for key in missing]), dtype=np.float32)
+            # Cached rows are shared between callers, so they must not be modified
+            encoded.flags.writeable = False
+            new = dict(zip(missing, encoded))
+            vectors.update(new)
+            self._disk_put(new)
+
+        with self._lock:
+            for key, vector in list(disk_found.items()) + list(new.items()):
+                self._remember(key, vector)
+            disk_hits = sum(1 for key in keys if key in disk_found)
+            self._stats["hits"] += hits
+            self._stats["disk_hits"] += disk_hits
+            self._stats["misses"] += len(keys) - hits - disk_hits
+
+        return np.stack([vectors[key] for key in keys])
+
+    def _disk_get(self, keys):
+        with self._disk_lock:
+            disk = self._disk_layer()
+            if disk is None:
+                return {}
+            try:
+                return disk.get_many(keys)
+            except sqlite3.Error:
+                self._stats["disk_errors"] += 1
+                return {}
+
+    def _disk_put(self, items):
+        with self._disk_lock:
+            disk = self._disk_layer()
+            if disk is None:
+                return
+            try:
+                disk.put_many(items.items())
+            except sqlite3.Error:
+                self._stats["disk_errors"] += 1
+
+    def clear(self):
+        """Drop the in-memory entries (the disk layer is kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the number of entries held in memory."""
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
@@ -0,0 +1,304 @@
+# Shared embedding service for the similarity recommender
+#
+#   python -m models.embedding_server             # serve on the default socket
+#   python -m models.embedding_server --health    # query a running service
+#
+# One process owns the SentenceTransformer and answers encode requests over a
+# Unix socket, so Streamlit workers and background jobs do not each load the
+# model and torch. Clients fall back to encoding in-process when no service
+# is running (see models.dl_similarity._encode).
+#
+# Each message is a frame of two big-endian uint32 lengths followed by a JSON
+# header and a binary payload. Encode replies carry the embeddings as raw
+# float32 bytes in the payload; every other reply is header only.
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Constants
+BASE_DIR = Path(__file__).parent.parent
+SOCKET_PATH = os.environ.get("OPENFUNDS_EMBEDDING_SOCKET", os.path.join(BASE_DIR, "data", "embedding.sock"))
+CLIENT_TIMEOUT = 30.0
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+LATENCY_WINDOW = 1000
+
+_FRAME = struct.Struct(">II")
+
+
+class EmbeddingServiceError(Exception):
+    """The service answered with an error (as opposed to being unreachable)."""
+
+
+def _recv_exact(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("Connection closed mid-message")
+        received += n
+    return bytes(buf)
+
+
+def send_message(sock, header, payload=b""):
+    """Send a JSON header and a binary payload as one frame."""
+    header = json.dumps(header).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(header), len(payload)) + header + payload)
+
+
+def recv_message(sock):
+    """Read one frame, returning (header dict, payload bytes)."""
+    header_size, payload_size = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    if header_size + payload_size > MAX_FRAME_SIZE:
+        raise ConnectionError(f"Frame of {header_size + payload_size} bytes exceeds limit")
+    header = json.loads(_recv_exact(sock, header_size))
+    payload = _recv_exact(sock, payload_size) if payload_size else b""
+    return header, payload
+
+
+class _LatencyTracker:
+    """Rolling window of encode latencies and batch sizes."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+        self.errors = 0
+
+    def record(self, seconds, batch_size):
+        with self._lock:
+            self._samples.append(seconds)
+            self.requests += 1
+            self.texts += batch_size
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def summary(self):
+        with self._lock:
+            samples = np.array(self._samples, dtype=np.float64) * 1000
+            stats = {"requests": self.requests, "texts": self.texts, "errors": self.errors, "window": len(samples)}
+        if len(samples):
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            stats.update(mean_ms=float(samples.mean()), p50_ms=float(p50), p95_ms=float(p95), p99_ms=float(p99))
+        return stats
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """Serve requests on one client connection until it closes."""
+
+    def handle(self):
+        while True:
+            try:
+                header, payload = recv_message(self.request)
+            except (OSError, ValueError, struct.error):
+                return
+            try:
+                reply, reply_payload = self.server.dispatch(header, payload)
+            except Exception as e:
+                logger.error(f"Embedding request failed: {e}")
+                self.server.latency.record_error()
+                reply, reply_payload = {"ok": False, "error": str(e)}, b""
+            try:
+                send_message(self.request, reply, reply_payload)
+            except OSError:
+                return
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix-socket server that owns the embedding model.
+
+    Operations:
+        encode  - {"texts": [...], "model": name} -> float32 (n x dim) payload
+        health  - model name, dimension, pid and uptime
+        latency - rolling encode latency percentiles and request counters
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path=SOCKET_PATH, model_name=None, encode=None):
+        from models.dl_similarity import MODEL_NAME, encode_in_process
+
+        self.model_name = model_name or MODEL_NAME
+        # Requests from concurrent connections share micro-batches
+        self._encode = encode or encode_in_process
+        self.latency = _LatencyTracker()
+        self.started_at = time.time()
+        self.dim = int(np.asarray(self._encode(["warmup"])).shape[-1])
+
+        _claim_socket_path(socket_path)
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o600)
+
+    def dispatch(self, header, payload):
+        op = header.get("op")
+        if op == "encode":
+            model_name = header.get("model")
+            if model_name and model_name != self.model_name:
+                raise EmbeddingServiceError(f"Service runs {self.model_name}, not {model_name}")
+            texts = header.get("texts") or []
+            start = time.perf_counter()
+            embeddings = np.ascontiguousarray(self._encode(texts), dtype=np.float32).reshape(len(texts), self.dim)
+            self.latency.record(time.perf_counter() - start, len(texts))
+            return {"ok": True, "shape": list(embeddings.shape)}, embeddings.tobytes()
+        if op == "health":
+            return {
+                "ok": True,
+                "model": self.model_name,
+                "dim": self.dim,
+                "pid": os.getpid(),
+                "uptime": time.time() - self.started_at,
+            }, b""
+        if op == "latency":
+            return dict(self.latency.summary(), ok=True), b""
+        raise EmbeddingServiceError(f"Unknown operation: {op}")
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.server_address)
+        except OSError:
+            pass
+
+
+def _claim_socket_path(socket_path):
+    """Remove a stale socket left by a dead service; refuse if one is still answering."""
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.remove(socket_path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"An embedding service is already listening on {socket_path}")
+
+
+class EmbeddingClient:
+    """
+    Thin client for the embedding service.
+
+    Each thread keeps its own connection, reopened after any failure.
+    Connection problems raise ConnectionError so callers can fall back to local
+    encoding; errors reported by the service raise EmbeddingServiceError.
+    """
+
+    def __init__(self, socket_path=SOCKET_PATH, timeout=CLIENT_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            self._local.sock = None
+            sock.close()
+
+    def request(self, header):
+        """Send one request and return (reply header, payload)."""
+        try:
+            sock = self._connection()
+            send_message(sock, header)
+            reply, payload = recv_message(sock)
+        except (OSError, ValueError, struct.error) as e:
+            self.close()
+            raise ConnectionError(f"Embedding service unavailable: {e}") from e
+        if not reply.get("ok"):
+            raise EmbeddingServiceError(reply.get("error", "unknown error"))
+        return reply, payload
+
+    def encode(self, texts, model_name=None):
+        """Encode texts remotely, returning a float32 (n x dim) array."""
+        reply, payload = self.request({"op": "encode", "texts": list(texts), "model": model_name})
+        return np.frombuffer(payload, dtype=np.float32).reshape(reply["shape"])
+
+    def health(self):
+        """Return the service's health report plus the measured round-trip time."""
+        start = time.perf_counter()
+        reply, _ = self.request({"op": "health"})
+        reply["round_trip_ms"] = (time.perf_counter() - start) * 1000
+        return reply
+
+    def latency(self):
+        """Return the service's rolling encode latency summary."""
+        return self.request({"op": "latency"})[0]
+
+
+def service_health(socket_path=SOCKET_PATH, timeout=2.0):
+    """Health report of the service at `socket_path`, or None if it is not reachable."""
+    if not os.path.exists(socket_path):
+        return None
+    client = EmbeddingClient(socket_path, timeout)
+    try:
+        report = client.health()
+        report["latency"] = client.latency()
+        return report
+    except (ConnectionError, EmbeddingServiceError):
+        return None
+    finally:
+        client.close()
+
+
+def serve(socket_path=SOCKET_PATH):
+    """Load the model and answer requests until interrupted."""
+    server = EmbeddingServer(socket_path)
+    # Exit through the finally block on SIGTERM too, so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.info(f"Embedding service ({server.model_name}, dim {server.dim}) listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Shared embedding-model service for OpenFunds.")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix socket path")
+    parser.add_argument("--health", action="store_true", help="print the running service's health and exit")
+    args = parser.parse_args()
+
+    if args.health:
+        report = service_health(args.socket)
+        if report is None:
+            print(f"No embedding service on {args.socket}")
+            raise SystemExit(1)
+        print(json.dumps(report, indent=2))
+    else:
+        serve(args.socket)
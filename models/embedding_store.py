@@ -0,0 +1,27 @@
+# Embedding helpers for the similarity recommender. The embeddings
+# themselves are stored in the campaign_embeddings table (db/embeddings.py).
+
+import hashlib
+
+import numpy as np
+
+# Sentence-transformers model the stored embeddings come from
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+def campaign_text(title, description):
+    """Text that gets embedded for a campaign."""
+    return f"{title} {description}"
+
+
+def content_hash(text):
+    """Stable hash of a campaign's embedded text."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def normalize(embeddings):
+    """L2-normalize embeddings row-wise so cosine similarity is a dot product."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
@@ -0,0 +1,98 @@
+# Micro-batching of encode requests for the similarity recommender. Kept
+# apart from models.dl_similarity so callers that only encode (the
+# benchmarks) do not load the database layer.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Concurrent encode requests are batched for up to this long or this many texts
+ENCODE_BATCH_WINDOW = 0.002
+ENCODE_MAX_BATCH = 64
+
+
+class EncodeBatcher:
+    """
+    Micro-batching front end for an encode function.
+
+    Callers hand their texts to a background thread, which collects
+    concurrent requests for up to `window` seconds (or until `max_batch`
+    texts are waiting), encodes them in one call and resolves each
+    caller's Future with its own rows. Requests that arrive while a batch
+    is encoding always join the next one; the window is only waited out
+    under concurrent load, so a single caller sees no added latency. A
+    batch of N texts costs far less than N batch-size-1 calls. Requests
+    of `max_batch` texts or more are encoded directly on the caller's
+    thread.
+    """
+
+    def __init__(self, encode, window=ENCODE_BATCH_WINDOW, max_batch=ENCODE_MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self._encode = encode
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.batches = 0
+        self.texts = 0
+
+    def submit(self, texts):
+        """
+        Queue texts for the next batch
+
+        Returns:
+            Future: resolves to an array with one embedding per text
+        """
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+                self._thread.start()
+            self._queue.put((list(texts), future))
+        return future
+
+    def encode(self, texts):
+        """Encode texts, sharing a batch with whatever other callers are waiting."""
+        texts = list(texts)
+        if len(texts) >= self.max_batch:
+            return np.asarray(self._encode(texts))
+        return self.submit(texts).result()
+
+    def _run(self):
+        # A lone caller should not pay for the window, so it is only waited
+        # out while the previous batch showed concurrent requests
+        concurrent = False
+        while True:
+            pending = [self._queue.get()]
+            count = len(pending[0][0])
+            deadline = time.monotonic() + (self.window if concurrent else 0)
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    # Requests that queued up during the last encode always join
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                pending.append(item)
+                count += len(item[0])
+            concurrent = len(pending) > 1
+            self._encode_batch(pending)
+
+    def _encode_batch(self, pending):
+        texts = [text for item_texts, _ in pending for text in item_texts]
+        try:
+            embeddings = np.asarray(self._encode(texts))
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.texts += len(texts)
+        offset = 0
+        for item_texts, future in pending:
+            future.set_result(embeddings[offset:offset + len(item_texts)])
+            offset += len(item_texts)
@@ -1,112 +1,354 @@
 import pandas as pd
-import joblib
 import os
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-import random
 import hashlib
+import threading
+import time
+
+from utils.dataset import dataset_version, iter_campaign_chunks, read_campaigns
+
+# joblib and sklearn are imported inside the functions that need them so
+# pages that only import this module do not pay for them up front
 
 CSV_PATH = "data_exports/campaigns.csv"
 MODEL_PATH_LR = "models/ml_model_lr.pkl"
 MODEL_PATH_RF = "models/ml_model_rf.pkl"
+TRAIN_STATE_PATH = "models/ml_train_state.npz"
+
+# Incremental training settings
+FEATURES = ['title_len', 'desc_len', 'target_amount']
+TRAIN_COLUMNS = ['id', 'title', 'description', 'target_amount', 'status']
+TRAIN_CHUNK_SIZE = 50000
+RF_TREES_PER_INCREMENT = 10
+# Changed rows wait until there are this many (of both classes) to learn from
+MIN_INCREMENT_ROWS = 200
+RF_MAX_TREES = 300
+FULL_RETRAIN_INTERVAL = 24 * 60 * 60
+
+_warmed_up = False
+
+# Process-wide cache of unpickled models: path -> (file version, object)
+_model_cache = {}
+_model_cache_lock = threading.Lock()
+_model_cache_stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+
+def warmup():
+    """Import the ML libraries ahead of the first prediction; later calls are no-ops."""
+    global _warmed_up
+    if _warmed_up:
+        return
+    import joblib
+    import sklearn.ensemble
+    import sklearn.linear_model
+    if os.path.exists(MODEL_PATH_LR) and os.path.exists(MODEL_PATH_RF):
+        load_models()
+    _warmed_up = True
+
+
+def _file_version(path):
+    """Identify a file version by its mtime, size and inode."""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _load_cached(path):
+    """Unpickle a model file once, reloading only when the file changes."""
+    import joblib
+
+    version = _file_version(path)
+    with _model_cache_lock:
+        cached = _model_cache.get(path)
+        if cached is not None and cached[0] == version:
+            _model_cache_stats["hits"] += 1
+            return cached[1]
+        _model_cache_stats["misses"] += 1
+        if cached is not None:
+            _model_cache_stats["reloads"] += 1
+
+    obj = joblib.load(path)
+    with _model_cache_lock:
+        _model_cache[path] = (version, obj)
+    return obj
+
+
+def load_models():
+    """Return (model_lr, model_rf, scaler), loading each file at most once per version."""
+    model_lr, scaler = _load_cached(MODEL_PATH_LR)
+    model_rf, _ = _load_cached(MODEL_PATH_RF)
+    return model_lr, model_rf, scaler
+
+
+def get_model_cache_stats():
+    """Return cache hit/miss/reload counters and the number of cached model files."""
+    with _model_cache_lock:
+        return dict(_model_cache_stats, cached=len(_model_cache))
+
+
+def clear_model_cache():
+    """Drop all cached models so the next prediction reloads from disk."""
+    with _model_cache_lock:
+        _model_cache.clear()
+
+
+def _prepare(df):
+    """Add feature, label and fingerprint columns to a chunk of the campaign export."""
+    df['title'] = df['title'].astype(str)
+    df['description'] = df['description'].astype(str)
+    df['status'] = df['status'].astype(str)
+    df['title_len'] = df['title'].str.len()
+    df['desc_len'] = df['description'].str.len()
+    df['target_amount'] = df['target_amount'].astype(float)
+    df['label'] = (df['status'].str.lower() == 'funded').astype(int)
+    # Changes to any of these mean the row must be learned again
+    df['fingerprint'] = pd.util.hash_pandas_object(
+        df[['title', 'description', 'target_amount', 'status']], index=False
+    ).to_numpy()
+    return df
+
+
+def _load_train_state():
+    """
+    Return (fingerprints by campaign id, time of last full retrain, CSV version
+    trained on or None), or None if never trained.
+    """
+    import numpy as np
+
+    if not os.path.exists(TRAIN_STATE_PATH):
+        return None
+    with np.load(TRAIN_STATE_PATH) as state:
+        fingerprints = pd.Series(state['fingerprints'], index=state['ids'])
+        csv_version = tuple(state['csv_version'].tolist()) if 'csv_version' in state else None
+        return fingerprints, float(state['last_full_train']), csv_version
+
+
+def _save_train_state(fingerprints, last_full_train, csv_version):
+    """Persist the training watermark atomically."""
+    import numpy as np
+
+    tmp_path = f"{TRAIN_STATE_PATH}.{os.getpid()}.tmp.npz"
+    np.savez(
+        tmp_path,
+        ids=fingerprints.index.to_numpy(dtype=np.int64),
+        fingerprints=fingerprints.to_numpy(dtype=np.uint64),
+        last_full_train=last_full_train,
+        csv_version=np.asarray(csv_version, dtype=np.int64),
+    )
+    os.replace(tmp_path, TRAIN_STATE_PATH)
+
 
 # TRAIN BOTH MODELS
 def train_model():
-    if not os.path.exists(CSV_PATH):
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    # Taken before reading, so an export landing mid-read is picked up next time
+    csv_version = dataset_version(CSV_PATH)
+    if csv_version is None:
         print("CSV not found.")
         return
 
-    df = pd.read_csv(CSV_PATH)
+    df = read_campaigns(CSV_PATH, TRAIN_COLUMNS)
     if len(df) < 3:
         print("Not enough data to train the model.")
         return
 
-    df['title_len'] = df['title'].astype(str).apply(len)
-    df['desc_len'] = df['description'].astype(str).apply(len)
-    df['target_amount'] = df['target_amount'].astype(float)
-    df['label'] = df['status'].apply(lambda x: 1 if str(x).lower() == 'funded' else 0)
+    df = _prepare(df)
 
     if df['label'].nunique() < 2:
         print("Training skipped: need both classes.")
         return
 
-    X = df[['title_len', 'desc_len', 'target_amount']]
+    X = df[FEATURES]
     y = df['label']
 
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
 
-    # Logistic Regression
-    model_lr = LogisticRegression()
+    # Logistic Regression, fitted with SGD so incremental runs can partial_fit it
+    model_lr = SGDClassifier(loss="log_loss", random_state=42)
     model_lr.fit(X_scaled, y)
 
     # Random Forest
     model_rf = RandomForestClassifier(n_estimators=100, random_state=42)
     model_rf.fit(X_scaled, y)
 
-    # Save both models
-    joblib.dump((model_lr, scaler), MODEL_PATH_LR)
-    joblib.dump((model_rf, scaler), MODEL_PATH_RF)
+    # Save both models; each file is swapped in atomically so readers never see a partial pickle
+    _atomic_dump((model_lr, scaler), MODEL_PATH_LR)
+    _atomic_dump((model_rf, scaler), MODEL_PATH_RF)
+    _save_train_state(pd.Series(df['fingerprint'].to_numpy(), index=df['id'].to_numpy()), time.time(), csv_version)
     print(" Both ML models trained and saved.")
 
 
-# PREDICT using both models, return the higher score
-def predict_success(title, description, target_amount):
-    if not os.path.exists(MODEL_PATH_LR) or not os.path.exists(MODEL_PATH_RF):
-        return 0.0, "Model not found. Train first."
+# TRAIN INCREMENTALLY on rows added or changed since the last training
+def train_model_incremental():
+    """
+    Update both models with only the campaigns that are new or changed
+
+    The CSV is streamed in chunks and compared against the fingerprints saved
+    by the previous training. Once at least MIN_INCREMENT_ROWS rows covering
+    both classes have changed, they are fed to the logistic model with
+    partial_fit and grow a few extra trees on the forest; until then they
+    stay unrecorded and are picked up again by the next run. The scaler is
+    kept frozen so existing trees stay valid. Falls back to a full train_model()
+    when there is no watermark yet, when the models predate incremental
+    training, when the forest has reached RF_MAX_TREES, or when the last full
+    retrain is older than FULL_RETRAIN_INTERVAL. Nothing is read when the
+    CSV export is the same file version the last training saw.
+    """
+    import joblib
+    import numpy as np
+
+    csv_version = dataset_version(CSV_PATH)
+    if csv_version is None:
+        print("CSV not found.")
+        return
+
+    state = _load_train_state()
+    if state is None or not os.path.exists(MODEL_PATH_LR) or not os.path.exists(MODEL_PATH_RF):
+        return train_model()
+
+    fingerprints, last_full_train, trained_version = state
+    if csv_version == trained_version and time.time() - last_full_train <= FULL_RETRAIN_INTERVAL:
+        print("Campaign export unchanged since last training.")
+        return
 
     model_lr, scaler = joblib.load(MODEL_PATH_LR)
     model_rf, _ = joblib.load(MODEL_PATH_RF)
 
-    title_len = len(title)
-    desc_len = len(description)
-    target = float(target_amount)
+    if (not hasattr(model_lr, "partial_fit")
+            or model_rf.n_estimators >= RF_MAX_TREES
+            or time.time() - last_full_train > FULL_RETRAIN_INTERVAL):
+        print("Running scheduled full retrain.")
+        return train_model()
+
+    changed_X, changed_y, changed_fp = [], [], []
+    for chunk in iter_campaign_chunks(CSV_PATH, TRAIN_COLUMNS, TRAIN_CHUNK_SIZE):
+        chunk = _prepare(chunk)
+        known = fingerprints.reindex(chunk['id'].to_numpy(), fill_value=0).to_numpy()
+        changed = chunk[known != chunk['fingerprint'].to_numpy()]
+        if changed.empty:
+            continue
 
-    X_input = scaler.transform([[title_len, desc_len, target]])
+        changed_X.append(scaler.transform(changed[FEATURES]))
+        changed_y.append(changed['label'].to_numpy())
+        changed_fp.append(pd.Series(changed['fingerprint'].to_numpy(), index=changed['id'].to_numpy()))
 
-    prob_lr = model_lr.predict_proba(X_input)[0][1]
-    prob_rf = model_rf.predict_proba(X_input)[0][1]
+    if not changed_fp:
+        _save_train_state(fingerprints, last_full_train, csv_version)
+        print("No new or changed campaigns since last training.")
+        return
 
-    # Predict using both models and return the higher confidence
-    prob_lr = model_lr.predict_proba(X_input)[0][1]
-    prob_rf = model_rf.predict_proba(X_input)[0][1]
+    X_new = np.concatenate(changed_X)
+    y_new = np.concatenate(changed_y)
 
-#  Use the higher score
-    prob = max(prob_lr, prob_rf)
+    # Trees grown on a handful of rows (or on one class) add noise, not signal;
+    # the fingerprints are left as they were so these rows are counted again
+    if len(y_new) < MIN_INCREMENT_ROWS or len(np.unique(y_new)) < 2:
+        _save_train_state(fingerprints, last_full_train, csv_version)
+        print(f"Waiting for more changes: {len(y_new)} new or changed campaigns pending.")
+        return
 
+    model_lr.partial_fit(X_new, y_new, classes=[0, 1])
+    model_rf.set_params(warm_start=True, n_estimators=model_rf.n_estimators + RF_TREES_PER_INCREMENT)
+    model_rf.fit(X_new, y_new)
 
-    #  Apply realistic base adjustments based on ML probability
-    if prob < 0.1:
-        prob = prob * 1.8 + 0.12
-    elif prob < 0.3:
-        prob = prob * 1.6 + 0.18
-    elif prob < 0.5:
-        prob = prob * 1.4 + 0.22
-    elif prob > 0.85:
-        prob = min(prob + 0.06, 0.99)
+    _atomic_dump((model_lr, scaler), MODEL_PATH_LR)
+    _atomic_dump((model_rf, scaler), MODEL_PATH_RF)
 
-    # Clamp prelim score
-    prob = min(max(prob, 0.33), 0.98)
+    new_fingerprints = pd.concat(changed_fp)
+    fingerprints = pd.concat([fingerprints.drop(new_fingerprints.index, errors="ignore"), new_fingerprints])
+    _save_train_state(fingerprints, last_full_train, csv_version)
+    print(f" Models updated incrementally with {len(y_new)} new or changed campaigns.")
 
-    # Inject unique hash-based variance AFTER boosting
+
+def _atomic_dump(obj, path):
+    """Pickle to a temporary file next to `path`, then rename it into place."""
+    import joblib
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+FEEDBACK = [
+    "This campaign is very clear and has a strong chance of being funded.",
+    "The campaign looks solid and just needs wider reach.",
+    "There is potential, but the story could use more clarity or emotion.",
+    "Consider refining your goal or improving how the purpose is explained.",
+]
+
+
+def _hash_adjustment(title, description, target_amount):
+    """Small per-campaign offset (0.000 to 0.009) derived from its content."""
     raw_string = f"{title.lower()}_{description.lower()}_{target_amount}"
     hash_digest = hashlib.sha256(raw_string.encode()).hexdigest()
     hash_value = int(hash_digest[:8], 16)
-    adjustment = (hash_value % 1000) / 100000.0  # range: 0.000 to 0.009
+    return (hash_value % 1000) / 100000.0
+
+
+# PREDICT using both models, return the higher score
+def predict_success(title, description, target_amount):
+    return predict_success_many([{
+        'title': title,
+        'description': description,
+        'target_amount': target_amount,
+    }])[0]
+
+
+# PREDICT for many campaigns at once, using both models and keeping the higher score
+def predict_success_many(rows):
+    """
+    Score many campaigns with one transform and one predict_proba per model
+
+    Args:
+        rows (iterable): Mappings with title, description and target_amount
+            (dicts or sqlite3.Row objects)
+
+    Returns:
+        list: (probability, feedback) tuple per row, in input order
+    """
+    import numpy as np
+
+    rows = list(rows)
+    if not rows:
+        return []
+    if not os.path.exists(MODEL_PATH_LR) or not os.path.exists(MODEL_PATH_RF):
+        return [(0.0, "Model not found. Train first.")] * len(rows)
+
+    model_lr, model_rf, scaler = load_models()
+
+    titles = [row['title'] for row in rows]
+    descriptions = [row['description'] for row in rows]
+    targets = [row['target_amount'] for row in rows]
+
+    X = np.column_stack([
+        [len(title) for title in titles],
+        [len(description) for description in descriptions],
+        np.asarray(targets, dtype=float),
+    ])
+    X_input = scaler.transform(X)
+
+    #  Use the higher score of the two models
+    prob = np.maximum(model_lr.predict_proba(X_input)[:, 1], model_rf.predict_proba(X_input)[:, 1])
+
+    #  Apply realistic base adjustments based on ML probability
+    prob = np.select(
+        [prob < 0.1, prob < 0.3, prob < 0.5, prob > 0.85],
+        [prob * 1.8 + 0.12, prob * 1.6 + 0.18, prob * 1.4 + 0.22, np.minimum(prob + 0.06, 0.99)],
+        default=prob,
+    )
+
+    # Clamp prelim score
+    prob = np.clip(prob, 0.33, 0.98)
+
+    # Inject unique hash-based variance AFTER boosting
+    adjustment = np.array([_hash_adjustment(t, d, a) for t, d, a in zip(titles, descriptions, targets)])
 
     #  Final prediction score with uniqueness
-    prob = min(prob + adjustment, 0.99)
+    prob = np.minimum(prob + adjustment, 0.99)
 
     #  Human-style feedback
-    if prob >= 0.9:
-        feedback = "This campaign is very clear and has a strong chance of being funded."
-    elif prob >= 0.7:
-        feedback = "The campaign looks solid and just needs wider reach."
-    elif prob >= 0.5:
-        feedback = "There is potential, but the story could use more clarity or emotion."
-    else:
-        feedback = "Consider refining your goal or improving how the purpose is explained."
-
-    return prob, feedback
\ No newline at end of file
+    feedback = np.select([prob >= 0.9, prob >= 0.7, prob >= 0.5], [0, 1, 2], default=3)
+
+    return [(float(p), FEEDBACK[f]) for p, f in zip(prob, feedback)]
@@ -1,6 +1,5 @@
 import streamlit as st
-from models.campaign import Campaign
-import pandas as pd
+from utils import cache
 
 # Set page configuration
 st.set_page_config(
@@ -179,15 +178,10 @@ st.write("OpenFunds is a modern decentralized fundraising platform built on bloc
 st.write("The platform emphasizes transparency and simplicity, making fundraising accessible to everyone. All campaigns are publicly viewable, allowing for community trust and support for projects that matter.")
 st.markdown("</div>", unsafe_allow_html=True)
 
-# Get statistics for the dashboard
-campaigns = Campaign.get_all_campaigns()
-total_campaigns = len(campaigns) if campaigns else 0
-
-# Calculate total fundraising
-total_btc = 0
-if campaigns:
-    for campaign in campaigns:
-        total_btc += campaign['current_amount']
+# Get statistics for the dashboard; cached until campaign data changes
+stats = cache.get_dashboard_stats()
+total_campaigns = stats['total_campaigns']
+total_btc = stats['total_raised']
 
 # Display dashboard with metrics
 st.markdown("<div class='dashboard-card'>", unsafe_allow_html=True)
@@ -156,15 +156,14 @@ if create_campaign:
         if success:
             st.success("Campaign created successfully! ")
 
-            # Train model and update embeddings
-            with st.spinner("Updating ML models..."):
-                try:
-                    from models.ml_predictor import train_model
-                    from models.dl_similarity import update_embeddings
-                    train_model()
-                    update_embeddings()
-                except Exception as e:
-                    st.error(f"Could not update models: {str(e)}")
+            # Queue model retraining and embedding updates for the background worker
+            try:
+                from utils.job_queue import JOB_EMBED, JOB_TRAIN, enqueue_job, start_worker_if_idle
+                st.session_state.model_jobs = [enqueue_job(JOB_TRAIN), enqueue_job(JOB_EMBED)]
+                start_worker_if_idle()
+                st.info("ML models are being updated in the background.")
+            except Exception as e:
+                st.error(f"Could not schedule model updates: {str(e)}")
             
             # Predict campaign success
             try:
@@ -191,6 +190,15 @@ with st.expander("Info", expanded=False):
         "owner_name": st.session_state.owner_name
     })
     
+    # Background model update status
+    if st.session_state.get("model_jobs"):
+        from utils.job_queue import get_job_status
+        st.write("Background model updates:")
+        for job_id in st.session_state.model_jobs:
+            job = get_job_status(job_id)
+            if job:
+                st.write(f"- {job['kind']} (job {job['id']}): {job['status']}")
+
     # Check for campaigns.csv
     csv_path = "data_exports/campaigns.csv"
     if os.path.exists(csv_path):
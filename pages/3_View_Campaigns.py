@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
 from models.campaign import Campaign
+from utils import cache
 import os
 from pathlib import Path
-from models.ml_predictor import predict_success
 
 
 # Set page configuration
@@ -49,19 +49,74 @@ def format_btc(amount):
 if st.button("🔄 Refresh Campaigns"):
     st.experimental_rerun()
 
-# Get all campaigns
-campaigns = Campaign.get_all_campaigns()
+# Number of campaigns fetched and rendered per page
+PAGE_SIZE = 20
+
+# Sort option label -> database sort key
+SORT_OPTIONS = {
+    "Newest": "newest",
+    "Highest Funded": "highest_funded",
+    "Closest to Goal": "closest_to_goal",
+    "Best Match": "relevance",
+}
+
+# Filter functionality
+st.subheader("Filter Campaigns")
+filter_col1, filter_col2, filter_col3 = st.columns(3)
+
+with filter_col1:
+    status_filter = st.selectbox(
+        "Status",
+        options=["All", "Active", "Funded", "Closed"],
+        index=0
+    )
+
+with filter_col2:
+    sort_by = st.selectbox(
+        "Sort By",
+        options=list(SORT_OPTIONS),
+        index=0
+    )
+
+with filter_col3:
+    search_term = st.text_input("Search", placeholder="Title, description or owner...")
+
+# Pages are served from the shared cache until campaign data changes, so
+# reruns (e.g. typing in the search box) do not query the database again
+
+# Cursors of the pages visited so far; start over whenever the filters change
+filter_key = (status_filter, sort_by, search_term)
+if st.session_state.get("page_filter_key") != filter_key:
+    st.session_state.page_filter_key = filter_key
+    st.session_state.page_cursors = [None]
+
+page_number = len(st.session_state.page_cursors)
+page_cursor = st.session_state.page_cursors[-1]
+status = None if status_filter == "All" else status_filter
+if search_term:
+    # Full-text search in SQLite; "Best Match" ranks by relevance
+    campaigns, next_cursor = cache.search_campaigns(
+        search_term, status=status, sort=SORT_OPTIONS[sort_by], limit=PAGE_SIZE, cursor=page_cursor
+    )
+else:
+    sort = SORT_OPTIONS[sort_by]
+    campaigns, next_cursor = cache.get_campaigns_page(
+        cursor=page_cursor,
+        limit=PAGE_SIZE,
+        sort="newest" if sort == "relevance" else sort,
+        status=status,
+    )
 
 if not campaigns:
-    st.info("No campaigns found. Create a new campaign to get started!")
-    if st.button("Create New Campaign"):
-        st.switch_page("pages/2_Create_Campaign.py")
+    if status_filter == "All" and not search_term and page_number == 1:
+        st.info("No campaigns found. Create a new campaign to get started!")
+        if st.button("Create New Campaign"):
+            st.switch_page("pages/2_Create_Campaign.py")
+    else:
+        st.info("No campaigns match the current filters.")
 else:
     # Convert to list of dicts for easier handling
-    campaign_list = []
-    for campaign in campaigns:
-        campaign_dict = dict(campaign)
-        campaign_list.append(campaign_dict)
+    campaign_list = [dict(campaign) for campaign in campaigns]
     
     # Show as a DataFrame first for overview
     df = pd.DataFrame(campaign_list)
@@ -70,61 +125,37 @@ else:
     df_display.columns = ['ID', 'Campaign', 'Owner', 'Target (BTC)', 'Current (BTC)', 'Status']
     
     # Display the table
-    st.subheader("All Campaigns")
+    st.subheader("Campaigns")
     st.dataframe(df_display, use_container_width=True)
     
-    # Filter functionality
-    st.subheader("Filter Campaigns")
-    filter_col1, filter_col2, filter_col3 = st.columns(3)
-    
-    with filter_col1:
-        status_filter = st.selectbox(
-            "Status",
-            options=["All", "Active", "Funded", "Closed"],
-            index=0
-        )
-    
-    with filter_col2:
-        sort_by = st.selectbox(
-            "Sort By",
-            options=["Newest", "Highest Funded", "Closest to Goal"],
-            index=0
-        )
-    
-    with filter_col3:
-        search_term = st.text_input("Search", placeholder="Campaign title or owner...")
-    
-    # Apply filters
-    filtered_campaigns = campaign_list.copy()
-    
-    if status_filter != "All":
-        filtered_campaigns = [c for c in filtered_campaigns if c['status'] == status_filter]
-    
-    if search_term:
-        search_term = search_term.lower()
-        filtered_campaigns = [c for c in filtered_campaigns if search_term in c['title'].lower() or search_term in c['owner_name'].lower()]
-    
-    # Apply sorting
-    if sort_by == "Newest":
-        # Already sorted by created_at DESC from database
-        pass
-    elif sort_by == "Highest Funded":
-        filtered_campaigns = sorted(filtered_campaigns, key=lambda x: x['current_amount'], reverse=True)
-    elif sort_by == "Closest to Goal":
-        filtered_campaigns = sorted(filtered_campaigns, key=lambda x: (x['current_amount'] / x['target_amount']) if x['target_amount'] > 0 else 0, reverse=True)
-    
-    # Display filtered results count
-    st.write(f"Displaying {len(filtered_campaigns)} of {len(campaign_list)} campaigns")
+    # Page navigation
+    first_shown = (page_number - 1) * PAGE_SIZE + 1
+    st.write(f"Displaying campaigns {first_shown}-{first_shown + len(campaign_list) - 1} (page {page_number})")
+    nav_col1, nav_col2 = st.columns(2)
+    with nav_col1:
+        if st.button("← Previous", disabled=page_number == 1):
+            st.session_state.page_cursors.pop()
+            st.experimental_rerun()
+    with nav_col2:
+        if st.button("Next →", disabled=next_cursor is None):
+            st.session_state.page_cursors.append(next_cursor)
+            st.experimental_rerun()
     
     # Divider
     st.markdown("---")
     st.subheader("Campaign Details")
     
+    # Imported here so the page only loads the ML stack when there are cards to score
+    from models.ml_predictor import predict_success_many
+
+    # Score every displayed campaign in one batch
+    predictions = predict_success_many(campaign_list)
+
     # Create columns for displaying campaigns
     col1, col2 = st.columns(2)
     
     # Display each campaign in a card
-    for i, campaign in enumerate(filtered_campaigns):
+    for i, campaign in enumerate(campaign_list):
         # Alternate between columns
         with col1 if i % 2 == 0 else col2:
             # Create a container for each campaign
@@ -139,11 +170,7 @@ else:
                 st.markdown(f"**Owner:** {campaign['owner_name']}")
                 st.markdown(f"**Description:** {campaign['description']}")
                 # ML Prediction
-                score, feedback = predict_success(
-                        campaign['title'],
-                        campaign['description'],
-                        campaign['target_amount']
-                           )
+                score, feedback = predictions[i]
                 st.markdown(f"🔮 **Predicted Success Likelihood:** {score * 100:.2f}%")
                 st.markdown(f"💬 **AI Feedback:** {feedback}")
                 st.markdown(f"**Bitcoin Address:** `{campaign['btc_address']}`")
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+from db.database import get_data_generation, register_change_hook
+
+# Entries expire after this long even if no change was detected
+CACHE_TTL = 300
+
+# The database generation is polled at most this often; writes made by this
+# process invalidate immediately, writes from other processes (the worker,
+# bulk imports) show up within this interval
+GENERATION_CHECK_INTERVAL = 1.0
+
+# Oldest entries are evicted beyond this many (every search keystroke is a key)
+MAX_ENTRIES = 512
+
+# Process-wide cache shared by every Streamlit session:
+# key -> (generation, stored_at, value)
+_entries = OrderedDict()
+_lock = threading.Lock()
+_generation = None
+_generation_checked = 0.0
+_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def _current_generation():
+    """Return the database generation, polling it at most every GENERATION_CHECK_INTERVAL."""
+    global _generation, _generation_checked
+    now = time.monotonic()
+    if now - _generation_checked < GENERATION_CHECK_INTERVAL:
+        return _generation
+
+    try:
+        _generation = get_data_generation()
+    except Exception as e:
+        # Fall back to TTL expiry alone
+        print(f"Could not read data generation: {e}")
+        _generation = None
+    _generation_checked = now
+    return _generation
+
+
+def cached_call(key, loader, ttl=CACHE_TTL):
+    """
+    Return the cached result for `key`, calling `loader()` if it is missing or stale
+
+    An entry is stale once the campaigns data has changed since it was
+    stored, it was invalidated, or it is older than `ttl` seconds.
+    """
+    with _lock:
+        generation = _current_generation()
+        entry = _entries.get(key)
+        if entry is not None and entry[0] == generation and time.monotonic() - entry[1] < ttl:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return entry[2]
+        _stats["misses"] += 1
+
+    value = loader()
+    with _lock:
+        _entries[key] = (generation, time.monotonic(), value)
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return value
+
+
+def invalidate():
+    """Drop every cached entry; called by write paths after they commit."""
+    global _generation_checked
+    with _lock:
+        _entries.clear()
+        # Re-read the generation on the next lookup so entries are stored under the new one
+        _generation_checked = 0.0
+        _stats["invalidations"] += 1
+
+
+# Write paths in this process drop the cache as soon as they commit
+register_change_hook(invalidate)
+
+
+def get_cache_stats():
+    """Return hit/miss/invalidation counters and the number of cached entries."""
+    with _lock:
+        return dict(_stats, entries=len(_entries))
+
+
+def get_all_campaigns():
+    """Cached Campaign.get_all_campaigns()."""
+    from models.campaign import Campaign
+    return cached_call(("all_campaigns",), Campaign.get_all_campaigns)
+
+
+def get_dashboard_stats():
+    """Cached Campaign.get_dashboard_stats()."""
+    from models.campaign import Campaign
+    return cached_call(("dashboard_stats",), Campaign.get_dashboard_stats)
+
+
+def get_campaigns_page(cursor=None, limit=20, sort='newest', status=None, search=None):
+    """Cached Campaign.get_campaigns_page()."""
+    from models.campaign import Campaign
+    return cached_call(
+        ("campaigns_page", cursor, limit, sort, status, search),
+        lambda: Campaign.get_campaigns_page(cursor, limit, sort, status, search),
+    )
+
+
+def search_campaigns(query, status=None, sort='relevance', limit=20, cursor=None):
+    """Cached Campaign.search_campaigns()."""
+    from models.campaign import Campaign
+    return cached_call(
+        ("search_campaigns", query, status, sort, limit, cursor),
+        lambda: Campaign.search_campaigns(query, status, sort, limit, cursor),
+    )
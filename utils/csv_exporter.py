@@ -1,46 +1,64 @@
-import pandas as pd
+import argparse
 import os
-from pathlib import Path
-from db.database import get_db_connection
+import time
+from db.database import CSV_PATH, connection
+from db.exporter import COMPRESSION_SUFFIXES, EXPORT_CHUNK_SIZE, write_campaigns
+from utils.dataset import feather_path_for
 
-def export_campaigns_to_csv():
+
+def export_campaigns_to_csv(csv_path=CSV_PATH, compression=None, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
     """
-    Export all campaigns from SQLite database to a CSV file
-    
+    Export all campaigns from SQLite database to a CSV file, plus an Arrow
+    copy next to it when pyarrow is installed
+
+    Uses the same chunked writer as the app's background exporter
+    (db.exporter.write_campaigns), so memory use does not grow with the
+    table and readers never see a partial export.
+
+    Args:
+        csv_path (str): Destination; '.gz' or '.zst' is appended when compressed
+        compression (str): None, 'gzip' or 'zstd'
+        chunk_size (int): Rows fetched and written per step
+        progress (callable): Called as progress(rows_written, total_rows) after each chunk
+
     Returns:
         bool: True if export was successful, False otherwise
     """
-    # Set paths
-    BASE_DIR = Path(__file__).parent.parent
-    CSV_PATH = os.path.join(BASE_DIR, 'data_exports', 'campaigns.csv')
-    
-    # Ensure the data_exports directory exists
-    os.makedirs(os.path.join(BASE_DIR, 'data_exports'), exist_ok=True)
-    
+    if compression is not None:
+        csv_path += COMPRESSION_SUFFIXES.get(compression, '')
+
+    # Ensure the export directory exists
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+    start = time.perf_counter()
+
     try:
-        # Get database connection
-        conn = get_db_connection()
-        
-        # Check if campaigns table exists
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='campaigns'")
-        if not cursor.fetchone():
-            conn.close()
-            return False
-        
-        # Export all campaigns to DataFrame
-        query = "SELECT * FROM campaigns"
-        campaigns_df = pd.read_sql_query(query, conn)
-        
-        # Close connection
-        conn.close()
-        
-        # Save to CSV
-        campaigns_df.to_csv(CSV_PATH, index=False)
-        
-        print(f"Exported {len(campaigns_df)} campaigns to {CSV_PATH}")
+        # Borrow a pooled database connection
+        with connection() as conn:
+            # Check if campaigns table exists
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='campaigns'")
+            if not cursor.fetchone():
+                return False
+
+            written = write_campaigns(conn, csv_path, feather_path_for(csv_path), compression, chunk_size, progress)
+
+        print(f"Exported {written} campaigns to {csv_path} in {time.perf_counter() - start:.1f}s")
         return True
-        
+
     except Exception as e:
         print(f"Error exporting campaigns to CSV: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export all campaigns to CSV.")
+    parser.add_argument("--output", default=CSV_PATH, help="destination CSV path")
+    parser.add_argument("--compression", choices=sorted(COMPRESSION_SUFFIXES), help="compress the CSV")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    def report(written, total):
+        print(f"  {written}/{total} campaigns ({written / max(total, 1):.0%})", end="\r", flush=True)
+
+    ok = export_campaigns_to_csv(args.output, args.compression, args.chunk_size, report)
+    raise SystemExit(0 if ok else 1)
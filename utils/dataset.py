@@ -0,0 +1,169 @@
+# Columnar (Arrow IPC / Feather v2) copy of the campaigns export
+#
+# The Arrow file is written uncompressed next to the CSV, so readers can
+# memory-map it and load only the columns they need instead of parsing the
+# whole CSV. pyarrow is optional: without it only the CSV is written and read.
+# pandas and pyarrow are imported on use, since the database layer imports
+# this module for the writer and must stay light.
+#
+# The write path converts the finished CSV with Arrow's own CSV reader rather
+# than passing Python rows to pyarrow: converting Python objects makes
+# pyarrow import pandas, which is slow and fails outright when an export is
+# flushed from atexit after the interpreter has begun shutting down.
+
+import os
+
+READ_CHUNK_SIZE = 50000
+
+# SQLite declared type -> Arrow type name; anything else is stored as a string
+_ARROW_TYPES = {'INTEGER': 'int64', 'REAL': 'float64'}
+
+
+def _pyarrow():
+    """Import pyarrow on demand, returning None if it is not installed."""
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def pyarrow_available():
+    """Check whether Arrow exports can be written and read."""
+    return _pyarrow() is not None
+
+
+def feather_path_for(csv_path):
+    """Path of the Arrow file kept alongside a CSV export."""
+    return os.path.splitext(csv_path)[0] + '.arrow'
+
+
+class FeatherWriter:
+    """
+    Write record batches to an Arrow IPC file.
+
+    Rows go to a temporary file that replaces `path` on close, so readers
+    never map a half-written file. Column types come from the SQLite
+    declared types so every batch shares one schema, even when a batch
+    happens to hold only NULLs in some column.
+    """
+
+    def __init__(self, path, columns, declared_types):
+        pa = _pyarrow()
+        if pa is None:
+            raise RuntimeError("pyarrow is required to write Arrow exports")
+        self.path = path
+        self.schema = pa.schema([
+            (name, getattr(pa, _ARROW_TYPES.get((declared_types.get(name) or '').upper(), 'string'))())
+            for name in columns
+        ])
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+        self._writer = pa.ipc.new_file(self._tmp_path, self.schema)
+
+    def write_batch(self, batch):
+        """Append an Arrow RecordBatch with this writer's schema."""
+        self._writer.write_batch(batch)
+
+    def close(self):
+        """Finish the file and swap it into place."""
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Discard the partially written file."""
+        try:
+            self._writer.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_feather_from_csv(csv_path, path, columns, declared_types):
+    """Convert a CSV export with these columns to an Arrow file at `path`, a block at a time."""
+    import pyarrow.csv as pa_csv
+
+    with FeatherWriter(path, columns, declared_types) as writer:
+        reader = pa_csv.open_csv(
+            csv_path,
+            parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+            # Exported text columns are NOT NULL or defaulted, so an empty
+            # field is an empty string, as it was in the table
+            convert_options=pa_csv.ConvertOptions(column_types=writer.schema, strings_can_be_null=False),
+        )
+        for batch in reader:
+            writer.write_batch(batch)
+
+
+def source_path(csv_path):
+    """
+    Return the file a read of this export should use, or None if there is none
+
+    The Arrow file is preferred when pyarrow is available and it is at least
+    as new as the CSV (exports write it after the CSV).
+    """
+    feather_path = feather_path_for(csv_path)
+    csv_exists = os.path.exists(csv_path)
+    if os.path.exists(feather_path) and pyarrow_available():
+        if not csv_exists or os.stat(feather_path).st_mtime_ns >= os.stat(csv_path).st_mtime_ns:
+            return feather_path
+    return csv_path if csv_exists else None
+
+
+def dataset_version(csv_path):
+    """Identify the current export by the mtime, size and inode of the file reads use, or None."""
+    path = source_path(csv_path)
+    if path is None:
+        return None
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _open_table(path):
+    """Memory-map an Arrow file; column buffers reference the mapping instead of copying it."""
+    pa = _pyarrow()
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def read_campaigns(csv_path, columns=None):
+    """
+    Load the campaigns export as a DataFrame, reading only `columns` if given
+
+    Raises:
+        FileNotFoundError: if neither the Arrow file nor the CSV exists
+    """
+    import pandas as pd
+
+    path = source_path(csv_path)
+    if path is None:
+        raise FileNotFoundError(csv_path)
+    if path != csv_path:
+        table = _open_table(path)
+        return (table.select(columns) if columns else table).to_pandas()
+    return pd.read_csv(csv_path, usecols=columns)
+
+
+def iter_campaign_chunks(csv_path, columns=None, chunk_size=READ_CHUNK_SIZE):
+    """Yield the campaigns export as DataFrames of at most `chunk_size` rows."""
+    import pandas as pd
+
+    path = source_path(csv_path)
+    if path is None:
+        raise FileNotFoundError(csv_path)
+    if path != csv_path:
+        table = _open_table(path)
+        if columns:
+            table = table.select(columns)
+        for batch in table.to_batches(max_chunksize=chunk_size):
+            yield batch.to_pandas()
+        return
+    yield from pd.read_csv(csv_path, usecols=columns, chunksize=chunk_size)
@@ -0,0 +1,220 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from db.database import DATA_ROOT
+
+# Set paths; the job queue lives next to the campaigns database
+BASE_DIR = Path(__file__).parent.parent
+JOBS_DB_PATH = os.path.join(DATA_ROOT, 'data', 'jobs.db')
+WORKER_SCRIPT = os.path.join(BASE_DIR, 'worker.py')
+
+# Job kinds
+JOB_TRAIN = "train"
+JOB_TRAIN_FULL = "train_full"
+JOB_EMBED = "embed"
+
+# A worker whose heartbeat is older than this is considered dead
+HEARTBEAT_TIMEOUT = 60
+
+
+def get_jobs_connection():
+    """Open a connection to the job queue database, creating its tables if needed."""
+    os.makedirs(os.path.dirname(JOBS_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        error TEXT,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL
+    )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_kind_status ON jobs (kind, status)')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS worker_heartbeat (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        pid INTEGER NOT NULL,
+        beat_at REAL NOT NULL
+    )
+    ''')
+    return conn
+
+
+def enqueue_job(kind):
+    """
+    Queue a job of the given kind
+
+    If a job of the same kind is already pending it is reused, so bursts of
+    campaign creations collapse into a single retrain/re-embed.
+
+    Returns:
+        int: ID of the pending job
+    """
+    conn = get_jobs_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        pending = conn.execute(
+            "SELECT id FROM jobs WHERE kind = ? AND status = 'pending' ORDER BY id LIMIT 1",
+            (kind,)
+        ).fetchone()
+        if pending:
+            job_id = pending['id']
+        else:
+            job_id = conn.execute(
+                'INSERT INTO jobs (kind, created_at) VALUES (?, ?)',
+                (kind, time.time())
+            ).lastrowid
+        conn.execute('COMMIT')
+        return job_id
+    finally:
+        conn.close()
+
+
+def claim_jobs(kind):
+    """Mark every pending job of a kind as running and return their IDs."""
+    conn = get_jobs_connection()
+    try:
+        rows = conn.execute(
+            "UPDATE jobs SET status = 'running', started_at = ? "
+            "WHERE kind = ? AND status = 'pending' RETURNING id",
+            (time.time(), kind)
+        ).fetchall()
+        return [row['id'] for row in rows]
+    finally:
+        conn.close()
+
+
+def finish_jobs(job_ids, error=None):
+    """Mark claimed jobs as done, or as failed with the given error message."""
+    if not job_ids:
+        return
+    conn = get_jobs_connection()
+    try:
+        placeholders = ','.join('?' * len(job_ids))
+        conn.execute(
+            f'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id IN ({placeholders})',
+            ('failed' if error else 'done', error, time.time(), *job_ids)
+        )
+    finally:
+        conn.close()
+
+
+def get_job_status(job_id):
+    """Return a job as a dict, or None if it does not exist."""
+    conn = get_jobs_connection()
+    try:
+        job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return dict(job) if job else None
+    finally:
+        conn.close()
+
+
+def get_recent_jobs(limit=20):
+    """Return the most recent jobs, newest first."""
+    conn = get_jobs_connection()
+    try:
+        jobs = conn.execute('SELECT * FROM jobs ORDER BY id DESC LIMIT ?', (limit,)).fetchall()
+        return [dict(job) for job in jobs]
+    finally:
+        conn.close()
+
+
+def register_worker():
+    """
+    Claim the single worker slot for this process
+
+    Jobs left running by a dead worker are put back to pending.
+
+    Returns:
+        bool: False if another live worker already holds the slot
+    """
+    conn = get_jobs_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        beat = conn.execute('SELECT pid, beat_at FROM worker_heartbeat WHERE id = 1').fetchone()
+        if beat and beat['pid'] != os.getpid() and time.time() - beat['beat_at'] < HEARTBEAT_TIMEOUT:
+            conn.execute('ROLLBACK')
+            return False
+        conn.execute(
+            'INSERT OR REPLACE INTO worker_heartbeat (id, pid, beat_at) VALUES (1, ?, ?)',
+            (os.getpid(), time.time())
+        )
+        conn.execute("UPDATE jobs SET status = 'pending', started_at = NULL WHERE status = 'running'")
+        conn.execute('COMMIT')
+        return True
+    finally:
+        conn.close()
+
+
+def heartbeat():
+    """Record that this process's worker is still alive."""
+    conn = get_jobs_connection()
+    try:
+        conn.execute(
+            'UPDATE worker_heartbeat SET beat_at = ? WHERE id = 1 AND pid = ?',
+            (time.time(), os.getpid())
+        )
+    finally:
+        conn.close()
+
+
+def unregister_worker_if_idle():
+    """
+    Release the worker slot if no jobs are pending
+
+    Runs in the same write transaction as the pending check, so a job queued
+    concurrently either keeps this worker alive or sees no worker and starts one.
+
+    Returns:
+        bool: True if the slot was released
+    """
+    conn = get_jobs_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        pending = conn.execute("SELECT 1 FROM jobs WHERE status = 'pending' LIMIT 1").fetchone()
+        if pending:
+            conn.execute('ROLLBACK')
+            return False
+        conn.execute('DELETE FROM worker_heartbeat WHERE id = 1 AND pid = ?', (os.getpid(),))
+        conn.execute('COMMIT')
+        return True
+    finally:
+        conn.close()
+
+
+def is_worker_alive():
+    """Check whether a worker has sent a heartbeat recently."""
+    conn = get_jobs_connection()
+    try:
+        beat = conn.execute('SELECT beat_at FROM worker_heartbeat WHERE id = 1').fetchone()
+        return bool(beat) and time.time() - beat['beat_at'] < HEARTBEAT_TIMEOUT
+    finally:
+        conn.close()
+
+
+def start_worker_if_idle():
+    """
+    Spawn a detached worker that drains the queue and exits, unless one is running
+
+    Returns:
+        bool: True if a new worker process was started
+    """
+    if is_worker_alive():
+        return False
+    subprocess.Popen(
+        [sys.executable, WORKER_SCRIPT, '--once'],
+        cwd=BASE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=(os.name == 'posix'),
+    )
+    return True
@@ -0,0 +1,104 @@
+# script: worker.py
+# Background worker that runs queued model retraining and embedding jobs.
+#
+#   python worker.py          # keep polling for jobs
+#   python worker.py --once   # drain the queue, then exit
+#
+# Full retrains happen automatically once a day as part of incremental
+# training, or can be scheduled (e.g. from cron) by queueing a "train_full" job.
+import argparse
+import threading
+import time
+import traceback
+
+from utils.job_queue import (
+    HEARTBEAT_TIMEOUT,
+    JOB_EMBED,
+    JOB_TRAIN,
+    JOB_TRAIN_FULL,
+    claim_jobs,
+    finish_jobs,
+    heartbeat,
+    register_worker,
+    unregister_worker_if_idle,
+)
+
+
+def run_train():
+    from models.ml_predictor import train_model_incremental
+    train_model_incremental()
+
+
+def run_train_full():
+    from models.ml_predictor import train_model
+    train_model()
+
+
+def run_embed():
+    from models.dl_similarity import update_embeddings
+    update_embeddings()
+
+
+# Job kind -> handler; a pending full retrain runs before incremental training
+HANDLERS = {
+    JOB_TRAIN_FULL: run_train_full,
+    JOB_TRAIN: run_train,
+    JOB_EMBED: run_embed,
+}
+
+
+def run_pending_jobs():
+    """Run each kind of job once, covering every job of that kind queued so far."""
+    ran = False
+    for kind, handler in HANDLERS.items():
+        job_ids = claim_jobs(kind)
+        if not job_ids:
+            continue
+        if not ran:
+            # Exports are debounced in the web process, so refresh the CSV the jobs read
+            from db.database import export_to_csv
+            export_to_csv()
+        ran = True
+        print(f"Running {kind} for jobs {job_ids}")
+        try:
+            handler()
+            finish_jobs(job_ids)
+        except Exception as e:
+            traceback.print_exc()
+            finish_jobs(job_ids, error=str(e))
+    return ran
+
+
+def _keep_alive(stop):
+    # Long jobs (a full forest fit) must not look like a dead worker
+    while not stop.wait(HEARTBEAT_TIMEOUT / 4):
+        heartbeat()
+
+
+def main(once=False, poll_interval=2.0, idle_exit_after=10.0):
+    if not register_worker():
+        print("Another worker is already running.")
+        return
+
+    stop = threading.Event()
+    threading.Thread(target=_keep_alive, args=(stop,), daemon=True).start()
+    idle_since = time.time()
+    try:
+        while True:
+            if run_pending_jobs():
+                idle_since = time.time()
+                continue
+            if once and time.time() - idle_since >= idle_exit_after and unregister_worker_if_idle():
+                break
+            time.sleep(poll_interval)
+    finally:
+        stop.set()
+        unregister_worker_if_idle()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued OpenFunds background jobs.")
+    parser.add_argument("--once", action="store_true", help="exit once the queue has been idle for a while")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds between queue checks")
+    args = parser.parse_args()
+    main(once=args.once, poll_interval=args.poll_interval)